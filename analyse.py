@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+r"""
+Jeu de données colonnaire de toutes les séances publiées (analyses inter-classes).
+- analyse/seances/etab=<établissement>/annee=<2025-2026>/<classe>.parquet : une partition par
+  établissement (export.etablissement, comme la page d'accueil) et année scolaire, un fichier par classe
+- Mise à jour incrémentale : l'empreinte de la progression (modele.Progression.empreinte,
+  la même que celle de la construction) est stockée dans les métadonnées du fichier ;
+  une classe inchangée n'est pas réécrite, seules les classes modifiées le sont.
+- analyse/seances.arrow : toutes les partitions réunies (Arrow IPC, non compressé),
+  lu par projection mémoire (memory map) -> une requête n'ouvre qu'un fichier, aucun ODS.
+  Refait dès qu'une partition est écrite ou supprimée.
+Alimenté par la sortie "analyse" de construire.py.
+Dépendance optionnelle : pyarrow (pip install pyarrow). Sans elle, la sortie est ignorée.
+
+Usage :
+  python analyse.py                          # chapitres abordés par classe
+  python analyse.py --jusqua 2025-11-15      # ... jusqu'à cette date
+"""
+
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+import export_progression_public as export
+from ecriture_atomique import ecrire_octets, existe, supprimer
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # dépendance optionnelle
+    pa = pq = None
+
+# ========= CONFIG =========
+ANALYSE_DIR = export.REPO / "analyse"            # local, non publié (même racine que docs/ : cf. Publication)
+PARTITIONS_DIR = ANALYSE_DIR / "seances"
+CONSOLIDE = ANALYSE_DIR / "seances.arrow"
+CLE_EMPREINTE = b"empreinte"
+SANS_DATE = "sans-date"
+
+
+def disponible() -> bool:
+    return pa is not None
+
+
+def annee_scolaire(d: date | None) -> str:
+    """Année scolaire (rentrée en septembre) : 2025-11-07 -> '2025-2026'."""
+    if d is None:
+        return SANS_DATE
+    debut = d.year if d.month >= 9 else d.year - 1
+    return f"{debut}-{debut + 1}"
+
+
+def schema():
+    return pa.schema([
+        ("etab", pa.string()),
+        ("annee", pa.string()),
+        ("classe", pa.string()),
+        ("date", pa.date32()),
+        ("chapitre", pa.string()),
+        ("titre", pa.string()),
+        ("contenu", pa.string()),
+        ("resume", pa.string()),
+        ("lien", pa.string()),
+        ("pieces", pa.list_(pa.string())),
+        ("empreinte", pa.string()),
+    ])
+
+
+def table_progression(prog, seances=None):
+    """Progression -> Table Arrow (une ligne par séance)."""
+    seances = prog.seances if seances is None else seances
+    colonnes = {
+        "etab": [export.etablissement(prog)] * len(seances),
+        "annee": [annee_scolaire(s.date) for s in seances],
+        "classe": [s.classe or prog.code for s in seances],
+        "date": [s.date for s in seances],
+        "chapitre": [s.chapitre for s in seances],
+        "titre": [s.titre for s in seances],
+        "contenu": [s.contenu for s in seances],
+        "resume": [s.resume for s in seances],
+        "lien": [s.lien for s in seances],
+        "pieces": [list(s.pieces) for s in seances],
+        "empreinte": [s.empreinte() for s in seances],
+    }
+    return pa.table(colonnes, schema=schema())
+
+
+def _fichiers_classe(code: str) -> list:
+    return sorted(PARTITIONS_DIR.glob(f"etab=*/annee=*/{code}.parquet")) if PARTITIONS_DIR.exists() else []
+
+
+def _empreinte_stockee(path: Path) -> bytes | None:
+    """Lue dans le pied de page Parquet uniquement (aucune donnée décodée)."""
+    try:
+        return (pq.read_schema(path).metadata or {}).get(CLE_EMPREINTE)
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+
+def _en_parquet(table, empreinte: str) -> bytes:
+    table = table.replace_schema_metadata({CLE_EMPREINTE: empreinte.encode("ascii")})
+    buf = pa.BufferOutputStream()
+    pq.write_table(table, buf, compression="zstd")
+    return buf.getvalue().to_pybytes()
+
+
+def mettre_a_jour_classe(prog) -> tuple:
+    """
+    Réécrit les partitions de la classe si son empreinte a changé
+    -> ({fichier: table écrite}, [partitions supprimées]).
+    """
+    empreinte = prog.empreinte()
+    par_annee = {}
+    for s in prog.seances:
+        par_annee.setdefault(annee_scolaire(s.date), []).append(s)
+    etab = export.etablissement(prog) or "_"
+    destinations = {PARTITIONS_DIR / f"etab={etab}" / f"annee={annee}" / f"{prog.code}.parquet": seances
+                    for annee, seances in sorted(par_annee.items())}
+    anciens = _fichiers_classe(prog.code)
+    # inchangée : même contenu ET mêmes partitions (un changement d'établissement déplace les fichiers)
+    if set(anciens) == destinations.keys() and all(_empreinte_stockee(f) == empreinte.encode("ascii")
+                                                   for f in anciens):
+        return {}, []
+    ecrits = {}
+    for dest, seances in destinations.items():
+        table = table_progression(prog, seances)
+        ecrire_octets(dest, _en_parquet(table, empreinte))
+        ecrits[dest] = table
+    # partitions devenues obsolètes (changement d'année ou d'établissement)
+    retires = sorted(set(anciens) - ecrits.keys())
+    for f in retires:
+        supprimer(f)
+    return ecrits, retires
+
+
+def consolider(nouvelles: dict | None = None) -> Path | None:
+    """
+    Réunit toutes les partitions dans un seul fichier Arrow IPC (lisible par memory map).
+    nouvelles : partitions écrites pendant cette construction (encore dans l'arbre préparé).
+    """
+    nouvelles = nouvelles or {}
+    fichiers = sorted(PARTITIONS_DIR.glob("etab=*/annee=*/*.parquet")) if PARTITIONS_DIR.exists() else []
+    tables = [pq.read_table(f, schema=schema()) for f in fichiers if f not in nouvelles and existe(f)]
+    tables += nouvelles.values()
+    if not tables:
+        supprimer(CONSOLIDE)
+        return None
+    table = pa.concat_tables(tables)
+    table = table.replace_schema_metadata(None).sort_by([("etab", "ascending"), ("classe", "ascending"),
+                                                        ("date", "ascending")])
+    buf = pa.BufferOutputStream()
+    with pa.ipc.new_file(buf, table.schema) as w:
+        w.write_table(table)
+    ecrire_octets(CONSOLIDE, buf.getvalue().to_pybytes())
+    return CONSOLIDE
+
+
+def mettre_a_jour(progressions) -> list:
+    """Point d'entrée de la construction : classes modifiées seulement, puis consolidation."""
+    if not disponible():
+        return []
+    nouvelles, retires = {}, []
+    for p in progressions:
+        ecrits_classe, retires_classe = mettre_a_jour_classe(p)
+        nouvelles.update(ecrits_classe)
+        retires += retires_classe
+    ecrits = list(nouvelles)
+    # une partition supprimée sans autre écriture doit aussi disparaître du fichier consolidé
+    if nouvelles or retires or not existe(CONSOLIDE):
+        consolide = consolider(nouvelles)
+        if consolide:
+            ecrits.append(consolide)
+    return ecrits
+
+
+def lire(chemin: Path = CONSOLIDE):
+    """Table de toutes les séances, projetée en mémoire (pas de copie ni de décodage)."""
+    return pa.ipc.open_file(pa.memory_map(str(chemin), "r")).read_all()
+
+
+# ========= REQUETES =========
+
+def chapitres_par_classe(table, jusqua: date | None = None) -> dict:
+    """(etab, classe) -> [(chapitre, nb séances, première date)] dans l'ordre d'apparition."""
+    if jusqua is not None:
+        import pyarrow.compute as pc
+        table = table.filter(pc.less_equal(table["date"], pa.scalar(jusqua, pa.date32())))
+    resultat = {}
+    for etab, classe, chapitre, d in zip(*(table[c].to_pylist() for c in ("etab", "classe", "chapitre", "date"))):
+        chapitres = resultat.setdefault((etab, classe), {})
+        if chapitre not in chapitres:
+            chapitres[chapitre] = [0, d]
+        chapitres[chapitre][0] += 1
+    return {k: [(ch, n, d) for ch, (n, d) in v.items()] for k, v in resultat.items()}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Chapitres abordés par classe (jeu colonnaire analyse/).")
+    ap.add_argument("--jusqua", type=date.fromisoformat, help="date limite AAAA-MM-JJ (incluse)")
+    args = ap.parse_args(argv)
+    if not disponible():
+        print("pyarrow n'est pas installé (pip install pyarrow).")
+        return 1
+    if not CONSOLIDE.exists():
+        print(f"{CONSOLIDE} absent : lancer d'abord 'python construire.py'.")
+        return 1
+    for (etab, classe), chapitres in sorted(chapitres_par_classe(lire(), args.jusqua).items()):
+        total = sum(n for _, n, _ in chapitres)
+        print(f"{etab} / {classe} : {total} séance(s), {len(chapitres)} chapitre(s)")
+        for chapitre, n, d in chapitres:
+            print(f"   {d.isoformat() if d else '?':<10}  {n:>3}  {chapitre or '(sans chapitre)'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
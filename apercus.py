@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Aperçus légers des pièces jointes pour les pages de progression.
+- Images (png, jpg, gif, bmp, webp...) : vignette WebP réduite
+- PDF : rendu de la première page en WebP
+- Cache par empreinte du contenu (sha256) : docs/assets/apercus/<empreinte>.webp
+  -> un même fichier n'est traité qu'une seule fois, quel que soit son nom ou sa classe
+- Génération dans un pool de processus (un fichier = une tâche), directement dans l'arbre
+  préparé de la construction (ecriture_atomique.destination) : rien n'est écrit dans docs/
+  avant la bascule
+- Échecs mémorisés par empreinte (<cache>/_echecs.json) : un fichier illisible n'est pas
+  retenté à chaque construction (seulement s'il change de contenu)
+Dépendances optionnelles : Pillow (images), PyMuPDF (PDF)
+  pip install pillow pymupdf
+Sans elles (vérifié une fois par processus), aucun fichier n'est haché ni confié au pool :
+le lien "Télécharger" est conservé.
+"""
+
+import hashlib
+import importlib.util
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from ecriture_atomique import destination, ecrire_texte, existe, lire_texte
+
+# ========= CONFIG =========
+TAILLE_MAX = (480, 480)      # boîte englobante de la vignette (px)
+QUALITE_WEBP = 70
+DPI_PDF = 60                 # résolution du rendu de la 1re page avant réduction
+MAX_WORKERS = None           # None -> nombre de CPU
+
+EXT_IMAGES = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp", ".tif", ".tiff"}
+EXT_PDF = {".pdf"}
+ECHECS_JSON = "_echecs.json"   # dans le dossier du cache
+
+_dependances = None            # (images, pdf) : Pillow / PyMuPDF importables
+
+
+def empreinte_fichier(path: Path, bloc: int = 1 << 20) -> str:
+    """sha256 du contenu (lecture par blocs pour les gros PDF)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(bloc), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def dependances() -> tuple:
+    """(images possibles, PDF possibles), sans importer les modules (vérifié une seule fois)."""
+    global _dependances
+    if _dependances is None:
+        pil = importlib.util.find_spec("PIL") is not None
+        mupdf = any(importlib.util.find_spec(m) is not None for m in ("pymupdf", "fitz"))
+        _dependances = (pil, pil and mupdf)
+    return _dependances
+
+
+def peut_avoir_apercu(path: Path) -> bool:
+    images, pdf = dependances()
+    ext = path.suffix.lower()
+    return (images and ext in EXT_IMAGES) or (pdf and ext in EXT_PDF)
+
+
+def _lire_echecs(chemin: Path) -> set:
+    if not existe(chemin):
+        return set()
+    try:
+        return set(json.loads(lire_texte(chemin)))
+    except ValueError:
+        return set()
+
+
+def _ouvrir_image(src: Path):
+    from PIL import Image
+    im = Image.open(src)
+    im.seek(0)  # 1re image des GIF/TIFF animés
+    return im
+
+
+def _ouvrir_pdf(src: Path):
+    try:
+        import pymupdf
+    except ImportError:  # anciennes versions de PyMuPDF
+        import fitz as pymupdf
+    from PIL import Image
+    with pymupdf.open(src) as doc:
+        if doc.page_count == 0:
+            return None
+        pix = doc[0].get_pixmap(dpi=DPI_PDF, alpha=False)
+        return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+
+def generer_apercu(src: str, dst: str) -> bool:
+    """Produit la vignette WebP de src dans dst. Exécuté dans un processus du pool."""
+    src_p, dst_p = Path(src), Path(dst)
+    try:
+        if src_p.suffix.lower() in EXT_PDF:
+            im = _ouvrir_pdf(src_p)
+        else:
+            im = _ouvrir_image(src_p)
+        if im is None:
+            return False
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if "A" in im.getbands() else "RGB")
+        im.thumbnail(TAILLE_MAX)
+        # écriture dans un fichier temporaire puis renommage : pas de vignette tronquée dans le cache
+        tmp = dst_p.with_suffix(".tmp")
+        im.save(tmp, format="WEBP", quality=QUALITE_WEBP, method=4)
+        tmp.replace(dst_p)
+        return True
+    except Exception:
+        # Pillow/PyMuPDF absent ou fichier illisible : pas d'aperçu
+        return False
+
+
+def apercus_pour(sources, cache_dir: Path, empreintes: dict | None = None) -> dict:
+    """
+    Associe à chaque fichier source le chemin de sa vignette (ou None).
+    empreintes : {source: sha256} déjà calculés (copies de PJ) -> pas de second hachage.
+    Les vignettes déjà présentes dans le cache (même empreinte) ne sont pas régénérées.
+    Les chemins renvoyés sont les chemins finaux (docs/...), même si la vignette n'est encore
+    que dans l'arbre préparé.
+    """
+    if not any(dependances()):
+        return {Path(src): None for src in sources}
+    echecs_connus = _lire_echecs(cache_dir / ECHECS_JSON)
+    resultat = {}
+    a_faire = {}  # empreinte -> (src, dst) : un seul travail par contenu
+    for src in sources:
+        src = Path(src)
+        if src in resultat:
+            continue
+        if not src.exists() or not peut_avoir_apercu(src):
+            resultat[src] = None
+            continue
+        sha = (empreintes or {}).get(src) or empreinte_fichier(src)
+        if sha in echecs_connus:
+            resultat[src] = None
+            continue
+        dst = cache_dir / f"{sha}.webp"
+        resultat[src] = dst
+        if not existe(dst) and dst.stem not in a_faire:
+            a_faire[dst.stem] = (src, destination(dst))
+
+    if a_faire:
+        travaux = list(a_faire.values())
+        if len(travaux) == 1:
+            ok = [generer_apercu(str(travaux[0][0]), str(travaux[0][1]))]
+        else:
+            with ProcessPoolExecutor(max_workers=MAX_WORKERS) as pool:
+                ok = list(pool.map(generer_apercu,
+                                   [str(s) for s, _ in travaux],
+                                   [str(d) for _, d in travaux]))
+        echecs = {cache_dir / d.name for (_, d), reussi in zip(travaux, ok) if not reussi}
+        for src, dst in resultat.items():
+            if dst in echecs:
+                resultat[src] = None
+        if echecs:
+            echecs_connus |= {d.stem for d in echecs}
+            ecrire_texte(cache_dir / ECHECS_JSON, json.dumps(sorted(echecs_connus), indent=1))
+
+    return resultat
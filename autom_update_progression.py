@@ -1,28 +1,53 @@
 # -*- coding: utf-8 -*-
 """
 Surveille des fichiers ODS (signature mtime+taille) et publie automatiquement :
-- Export HTML (via export_progression_public.py)
-- git add/commit/push (docs/progressions + docs/assets)
-A lancer avec pythonw.exe (silencieux). Log : autom_update.log
+- Construction du site (via construire.py : 1 lecture par ODS, toutes les sorties)
+- git add/commit (docs/) sous le verrou de ecriture_atomique : instantané cohérent de docs/
+- git push en arrière-plan : la construction suivante peut démarrer pendant le push
+- Publication datée : réveil uniquement aux échéances de .etat/echeances.json (cf. fenetre_dates.py),
+  reconstruction des seules classes concernées
+- Reprise après arrêt : empreinte (sha256) du dernier ODS publié par classe dans .etat/surveillance.json ;
+  au démarrage, seules les classes dont le contenu diffère sont republiées
+- Export en échec (Drive hors ligne, ODS illisible...) : la classe est retentée plus tard,
+  délai doublé à chaque échec (REESSAI_MIN -> REESSAI_MAX), remis à zéro au premier succès
+- File d'attente sans doublon : un export lent fusionne les modifications répétées d'une même
+  classe en un seul export (le scan continue pendant l'export) ; une entrée par classe au plus,
+  donc jamais plus de len(FILES) classes en attente
+A lancer avec pythonw.exe (silencieux).
+Journal JSON (hors dépôt, rotation + .gz) : cf. journal.py
+  python journal.py -n 5 --classe 302 --evenement publication
 """
 
-import os, time, subprocess, traceback
+import os, json, time, logging, threading, subprocess, traceback
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
 
+import journal
+from apercus import empreinte_fichier
+from export_progression_public import CLASSES
+from ecriture_atomique import ecrire_texte, verrou_docs
+from fenetre_dates import Echeancier
+
 # ========= CONFIG =========
 PYTHON = os.path.join(os.environ.get("LOCALAPPDATA", r"C:\Users\Utilisateur\AppData\Local"),
                       r"Programs\Python\Python313\python.exe")
 REPO = Path(r"C:\Users\Utilisateur\Desktop\cours-de-maths")
-EXPORT_SCRIPT = REPO / "export_progression_public.py"
-LOGFILE = REPO / "autom_update.log"
+EXPORT_SCRIPT = REPO / "construire.py"
+ECHEANCES_JSON = REPO / ".etat" / "echeances.json"   # écrit par construire.py
+CONSTRUITES_JSON = REPO / ".etat" / "construites.json"  # idem : classes basculées par la dernière construction
+ETAT_JSON = REPO / ".etat" / "surveillance.json"     # dernier contenu publié par classe
 CREATE_NO_WINDOW = 0x08000000
 
 # Intervalle de scan et fenêtre de stabilisation
 CHECK_INTERVAL = 3          # secondes entre scans
 STABILIZE_WINDOW = 2        # nb de scans CONSÉCUTIFS identiques avant déclenchement
+VIDAGE_JOURNAL = 60         # secondes max avant écriture sur disque du journal en mémoire
+REESSAI_MIN = 60            # secondes avant de retenter une classe dont l'export a échoué...
+REESSAI_MAX = 3600          # ... délai doublé à chaque nouvel échec, plafonné
 
 # Fichiers surveillés : code_classe -> chemin ODS (source dans "Mon Drive")
+# (seuls les codes présents dans export_progression_public.CLASSES sont construits)
 FILES = {
     "2nde_7": Path(r"C:\Users\Utilisateur\Desktop\Lycee_Felix_Faure\Seconde\2nde_7\2nde_7_Progression.ods"),
     "302":    Path(r"C:\Users\Utilisateur\Mon Drive\Enseignement\College Montherlant 2025-2026\302\302_Progression.ods"),
@@ -38,10 +63,12 @@ HTML_PATHS = {
 # ==========================
 
 
-def log(msg: str):
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(LOGFILE, "a", encoding="utf-8") as f:
-        f.write(f"[{ts}] {msg}\n")
+JOURNAL = journal.configurer("surveillance")
+
+
+def log(msg: str, niveau: int = logging.INFO, **champs):
+    """Événement structuré (champs : classe, classes, evenement, durées en s...)."""
+    JOURNAL.log(niveau, msg, extra={"champs": champs})
 
 
 def _sig(path: Path):
@@ -53,55 +80,240 @@ def _sig(path: Path):
         return None
 
 
-def run_export():
+def _empreinte(path: Path):
+    try:
+        return empreinte_fichier(path)
+    except OSError:
+        return None
+
+
+class EtatSurveillance:
+    """classe -> sha256 du dernier ODS publié avec succès (survit aux redémarrages)."""
+
+    def __init__(self, chemin: Path):
+        self.chemin = chemin
+        self.publie = {}
+        if chemin.exists():
+            try:
+                self.publie = json.loads(chemin.read_text(encoding="utf-8"))
+            except ValueError:
+                self.publie = {}
+
+    def differe(self, code: str, empreinte) -> bool:
+        return empreinte is not None and self.publie.get(code) != empreinte
+
+    def enregistrer(self, empreintes: dict):
+        self.publie.update({k: v for k, v in empreintes.items() if v is not None})
+        ecrire_texte(self.chemin, json.dumps(self.publie, indent=2, sort_keys=True))
+
+
+class FileAttente:
+    """
+    File sans doublon : une classe déjà en attente n'est pas ajoutée une 2e fois.
+    Taille naturellement bornée par le nombre de classes surveillées (FILES).
+    """
+
+    def __init__(self):
+        self._codes = OrderedDict()
+        self._cond = threading.Condition()
+
+    def ajouter(self, code: str) -> None:
+        with self._cond:
+            if code in self._codes:
+                return          # fusionné avec la demande en attente
+            self._codes[code] = None
+            self._cond.notify()
+
+    def prendre_tout(self) -> list:
+        """Bloque jusqu'à au moins une demande, puis vide la file (un seul export pour le lot)."""
+        with self._cond:
+            while not self._codes:
+                self._cond.wait()
+            codes = list(self._codes)
+            self._codes.clear()
+            return codes
+
+
+class Reessais:
+    """classe -> prochain essai après un export en échec (recul exponentiel, partagé entre threads)."""
+
+    def __init__(self, delai_min: float = REESSAI_MIN, delai_max: float = REESSAI_MAX):
+        self.delai_min, self.delai_max = delai_min, delai_max
+        self._delai = {}        # classe -> dernier délai appliqué
+        self._prochain = {}     # classe -> time.monotonic() du prochain essai
+        self._verrou = threading.Lock()
+
+    def echec(self, code: str) -> float:
+        with self._verrou:
+            delai = min(max(self.delai_min, 2 * self._delai.get(code, 0)), self.delai_max)
+            self._delai[code] = delai
+            self._prochain[code] = time.monotonic() + delai
+            return delai
+
+    def reussite(self, code: str) -> None:
+        with self._verrou:
+            self._delai.pop(code, None)
+            self._prochain.pop(code, None)
+
+    def echus(self) -> list:
+        """Classes à retenter maintenant (retirées de l'attente ; le délai reste pour le prochain échec)."""
+        maintenant = time.monotonic()
+        with self._verrou:
+            codes = sorted(k for k, t in self._prochain.items() if t <= maintenant)
+            for k in codes:
+                del self._prochain[k]
+            return codes
+
+
+def run_export(codes=None) -> int:
     cmd = [PYTHON, str(EXPORT_SCRIPT)] if Path(PYTHON).exists() else ["python", str(EXPORT_SCRIPT)]
+    cmd += list(codes or [])
+    t0 = time.perf_counter()
     try:
         rc = subprocess.call(cmd, cwd=str(REPO), creationflags=CREATE_NO_WINDOW)
-        log(f"[INFO] Export terminé (code={rc}).")
+        log(f"Export terminé (code={rc}).", logging.INFO if rc == 0 else logging.ERROR,
+            evenement="export", classes=list(codes or []), code=rc, duree=round(time.perf_counter() - t0, 2))
+        return rc
     except Exception:
-        log("[ERREUR] Exception pendant l'export :\n" + traceback.format_exc())
+        log("Exception pendant l'export", logging.ERROR, evenement="export",
+            classes=list(codes or []), trace=traceback.format_exc())
+        return -1
+
 
+def classes_construites() -> set:
+    """Classes basculées par la dernière construction (fichier absent : construction interrompue)."""
+    try:
+        return set(json.loads(CONSTRUITES_JSON.read_text(encoding="utf-8")))
+    except (OSError, ValueError):
+        return set()
+
+
+_push_en_cours = None   # subprocess.Popen du dernier 'git push'
 
-def git_publish():
+
+def git_publish() -> bool:
+    global _push_en_cours
     try:
-        # Ajoute pages ET assets (pièces jointes)
-        subprocess.call(["git", "add", "docs/progressions", "docs/assets"], cwd=str(REPO), creationflags=CREATE_NO_WINDOW)
+        # add + commit sous verrou : aucune bascule de construction ne peut avoir lieu entre les deux
+        with verrou_docs(REPO):
+            # Ajoute toutes les sorties : progressions, pages de séances, index, assets (pièces jointes)
+            rc = subprocess.call(["git", "add", "docs"], cwd=str(REPO), creationflags=CREATE_NO_WINDOW)
+            if rc != 0:
+                log(f"git add en échec (code={rc})", logging.ERROR, evenement="git", code=rc)
+                return False
 
-        status = subprocess.run(["git", "status", "--porcelain"], cwd=str(REPO),
-                                creationflags=CREATE_NO_WINDOW, capture_output=True, text=True)
-        if status.stdout.strip():
+            # seul l'index compte (docs/) : classes/ et les fichiers locaux non suivis n'y sont pas
+            diff = subprocess.call(["git", "diff", "--cached", "--quiet"], cwd=str(REPO),
+                                   creationflags=CREATE_NO_WINDOW)
+            if diff == 0:
+                log("Aucun changement à publier.", evenement="git")
+                return True
             msg = f"MAJ auto ({datetime.now().strftime('%Y-%m-%d %H:%M')})"
-            subprocess.call(["git", "commit", "-m", msg], cwd=str(REPO), creationflags=CREATE_NO_WINDOW)
-            subprocess.call(["git", "push"], cwd=str(REPO), creationflags=CREATE_NO_WINDOW)
-            log("[INFO] Git push effectué.")
-        else:
-            log("[INFO] Aucun changement à publier.")
+            rc = subprocess.call(["git", "commit", "-m", msg], cwd=str(REPO), creationflags=CREATE_NO_WINDOW)
+            if rc != 0:
+                log(f"git commit en échec (code={rc})", logging.ERROR, evenement="git", code=rc)
+                return False
+
+        # un seul push à la fois ; le suivant emportera tous les commits en attente
+        if _push_en_cours is not None and _push_en_cours.poll() is None:
+            _push_en_cours.wait()
+        _push_en_cours = subprocess.Popen(["git", "push"], cwd=str(REPO), creationflags=CREATE_NO_WINDOW)
+        log("Git push lancé.", evenement="git")
+        return True
     except Exception:
-        log("[ERREUR] Git :\n" + traceback.format_exc())
+        log("Erreur git", logging.ERROR, evenement="git", trace=traceback.format_exc())
+        return False
+
+
+def travailleur(attente: FileAttente, etat: EtatSurveillance, echeancier: Echeancier, reessais: Reessais):
+    """Thread d'export : traite les classes en attente par lots, pendant que le scan continue."""
+    while True:
+        codes = attente.prendre_tout()
+        try:
+            # empreintes AVANT export : ce qui est publié correspond à ce contenu
+            empreintes = {k: _empreinte(FILES[k]) for k in codes if k in FILES}
+            log(f"Export de {codes}", evenement="lot", classes=codes)
+            t0 = time.perf_counter()
+            CONSTRUITES_JSON.unlink(missing_ok=True)
+            rc = run_export(codes)
+            duree_export = time.perf_counter() - t0
+            echeancier.charger()
+            # classes réellement construites : une classe illisible d'un lot ne doit être ni
+            # enregistrée comme publiée ni remise à zéro côté réessais (rc != 0 dans ce cas)
+            construites = [k for k in codes if k in classes_construites()]
+
+            # Optionnel: "toucher" les HTML pour marquer une mtime récente (pas obligatoire)
+            for k in codes:
+                html = HTML_PATHS.get(k)
+                if html and html.exists():
+                    os.utime(html, None)
+
+            t1 = time.perf_counter()
+            publie = bool(construites) and git_publish()
+            if publie:
+                etat.enregistrer({k: v for k, v in empreintes.items() if k in construites})
+                duree_git = time.perf_counter() - t1
+                for k in construites:
+                    log(f"Publication {k}", evenement="publication", classe=k,
+                        duree_export=round(duree_export, 2), duree_git=round(duree_git, 2),
+                        duree=round(duree_export + duree_git, 2))
+            # échec : construction annulée, echeances.json rechargé avec l'échéance déjà passée
+            # (ou ODS de la classe illisible : son échéance n'a pas avancé) -> pas de relance à
+            # chaque scan, mais un nouvel essai après recul
+            echues = set(echeancier.classes_echues())
+            echecs = [k for k in codes if not publie or k not in construites or k in echues]
+            for k in codes:
+                if k not in echecs:
+                    reessais.reussite(k)
+            for k in echecs:
+                if k in echues:
+                    echeancier.mettre_a_jour(k, None)
+                delai = reessais.echec(k)
+                log(f"Export de {k} en échec : nouvel essai dans {delai:.0f}s", logging.WARNING,
+                    evenement="reessai", classe=k, delai=delai)
+        except Exception:
+            log("Thread d'export", logging.ERROR, evenement="erreur", trace=traceback.format_exc())
+            for k in codes:
+                reessais.echec(k)
+        finally:
+            journal.vider(JOURNAL)
 
 
 def main():
-    log("=== Démarrage surveillance (mtime+taille) ===")
-    paths = {k: v for k, v in FILES.items()}
+    log("=== Démarrage surveillance (mtime+taille) ===", evenement="demarrage")
+    inconnues = sorted(FILES.keys() - CLASSES.keys())
+    if inconnues:
+        log(f"Classes absentes de export_progression_public.CLASSES, non surveillées : {inconnues}",
+            logging.WARNING, evenement="init", classes=inconnues)
+    paths = {k: v for k, v in FILES.items() if k in CLASSES}
     last_sig = {k: _sig(p) for k, p in paths.items()}
-    stable_count = {k: 0 for k in paths}
+    # état initial considéré stable : seule une modification ultérieure déclenche le scan
+    stable_count = {k: STABILIZE_WINDOW for k in paths}
+    etat = EtatSurveillance(ETAT_JSON)
+    echeancier = Echeancier(ECHEANCES_JSON)
+    attente = FileAttente()
+    reessais = Reessais()
 
-    # Log état initial
+    # Log état initial + reprise : ce qui a changé pendant l'arrêt est republié
     for k, p in paths.items():
-        log(f"[INIT] {k} -> {p}")
-        log(f"[INIT] Signature initiale: {last_sig[k]}")
+        log(f"{k} -> {p}", evenement="init", classe=k, signature=last_sig[k])
+        if etat.differe(k, _empreinte(p)):
+            log(f"{k} : contenu différent du dernier publié → export", evenement="reprise", classe=k)
+            attente.ajouter(k)
+    log(f"Prochaine échéance de publication : {echeancier.prochain_reveil()}", evenement="init")
+    journal.vider(JOURNAL)
+    dernier_vidage = time.monotonic()
+
+    threading.Thread(target=travailleur, args=(attente, etat, echeancier, reessais), daemon=True).start()
 
     while True:
         try:
-            trigger = False
-            changed_keys = []
-
             for k, p in paths.items():
                 sig = _sig(p)
 
                 if sig != last_sig[k]:
                     # Changement détecté (nouvelle signature)
-                    log(f"[INFO] Changement détecté pour {k}: {last_sig[k]} -> {sig}")
+                    log(f"Changement détecté pour {k}: {last_sig[k]} -> {sig}", evenement="changement", classe=k)
                     last_sig[k] = sig
                     stable_count[k] = 0
                 else:
@@ -109,27 +321,37 @@ def main():
                     stable_count[k] += 1
 
                 # Déclenchement seulement quand le fichier est stable depuis STABILIZE_WINDOW scans
+                # et que son contenu diffère du dernier publié (simple 'touch' / resynchro Drive : ignoré)
                 if sig is not None and stable_count[k] == STABILIZE_WINDOW:
-                    changed_keys.append(k)
-                    trigger = True
-
-            if trigger:
-                log(f"[INFO] Fichiers stables : {changed_keys} → lancement export")
-                run_export()
+                    if etat.differe(k, _empreinte(p)):
+                        log(f"Fichier stable : {k} → mise en attente", evenement="attente", classe=k)
+                        attente.ajouter(k)
+                    else:
+                        log(f"{k} : contenu identique au dernier publié, rien à faire", evenement="inchange", classe=k)
 
-                # Optionnel: "toucher" les HTML pour marquer une mtime récente (pas obligatoire)
-                for k in changed_keys:
-                    html = HTML_PATHS.get(k)
-                    if html and html.exists():
-                        os.utime(html, None)
+            # Séances qui deviennent visibles (date atteinte) : seulement les classes concernées
+            reveil = echeancier.prochain_reveil()
+            if reveil is not None and datetime.now() >= reveil:
+                dues = echeancier.classes_echues()
+                log(f"Échéance atteinte ({reveil}) : {dues} → mise en attente", evenement="echeance", classes=dues)
+                # retirées jusqu'au rechargement par le thread d'export (pas de redéclenchement),
+                # AVANT la mise en file : le rechargement ne peut pas être effacé après coup
+                for k in dues:
+                    echeancier.mettre_a_jour(k, None)
+                    attente.ajouter(k)
 
-                git_publish()
+            # exports en échec dont le délai de recul est écoulé
+            for k in reessais.echus():
+                log(f"{k} : nouvel essai d'export", evenement="reessai", classe=k)
+                attente.ajouter(k)
 
+            if time.monotonic() - dernier_vidage >= VIDAGE_JOURNAL:
+                journal.vider(JOURNAL)
+                dernier_vidage = time.monotonic()
             time.sleep(CHECK_INTERVAL)
 
         except Exception as e:
-            log(f"[ERREUR] Boucle principale : {repr(e)}")
-            log(traceback.format_exc())
+            log(f"Boucle principale : {repr(e)}", logging.ERROR, evenement="erreur", trace=traceback.format_exc())
             time.sleep(CHECK_INTERVAL)
 
 
@@ -4,11 +4,11 @@
 # Dépendances: pandas, odfpy  (pip install pandas odfpy)
 
 import os
-import re
 import pathlib
-from datetime import datetime
 
-import pandas as pd
+from ecriture_atomique import ecrire_texte
+from entetes import lire_feuille, manquants
+from modele import Progression, seances_depuis_df
 
 # ==============================
 # CONFIG
@@ -19,14 +19,9 @@ ODS_PATH = REPO_ROOT / "cahier_de_texte.ods"  # nom attendu à la racine du site
 OUTPUT_DIR = REPO_ROOT / "classes"            # pages générées
 TARGET_CLASSES = {"5e"}                       # ne générer que ces classes (modifier si besoin)
 
-# Noms de colonnes tolérés (insensibles à la casse et aux accents)
-CAND_DATE = {"date", "jour"}
-CAND_CLASSE = {"classe", "classe "}
-CAND_CHAP = {"chapitre", "chapitre "}
-CAND_TITRE = {"titre", "intitulé", "intitule"}
-CAND_RESUME = {"resume", "résumé", "description"}
-CAND_LIEN = {"lien", "url", "lien_externe"}
-CAND_PJ = {"pieces_jointes", "pièces_jointes", "pj", "pieces", "pièces"}
+# Colonnes lues (en-têtes tolérés : cf. entetes.SYNONYMES) et colonnes obligatoires
+CHAMPS = ("date", "classe", "chapitre", "titre", "resume", "lien", "pj")
+REQUIS = ("date", "classe", "chapitre", "titre")
 
 # ==============================
 # UTILITAIRES
@@ -34,67 +29,6 @@ CAND_PJ = {"pieces_jointes", "pièces_jointes", "pj", "pieces", "pièces"}
 def ensure_dir(p: pathlib.Path) -> None:
     p.mkdir(parents=True, exist_ok=True)
 
-def slugify(text: str, maxlen: int = 80) -> str:
-    t = text.lower()
-    t = re.sub(r"[^\w\s-]", "", t, flags=re.UNICODE)
-    t = re.sub(r"\s+", "-", t).strip("-")
-    return t[:maxlen] if len(t) > maxlen else t
-
-def parse_date(value) -> str:
-    # pandas peut renvoyer Timestamp
-    if isinstance(value, (pd.Timestamp, datetime)):
-        return value.strftime("%Y-%m-%d")
-    v = str(value).strip()
-    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d"):
-        try:
-            return datetime.strptime(v, fmt).strftime("%Y-%m-%d")
-        except Exception:
-            pass
-    # dernier recours ISO
-    try:
-        return datetime.fromisoformat(v).strftime("%Y-%m-%d")
-    except Exception:
-        raise ValueError(f"Date invalide: {value}")
-
-def split_pieces(cell) -> list:
-    if pd.isna(cell) or str(cell).strip() == "":
-        return []
-    parts = [str(p).strip().replace("\\", "/") for p in str(cell).split(";")]
-    return [p for p in parts if p]
-
-def norm_key(s: str) -> str:
-    s = s.strip().lower()
-    # remplace les accents courants
-    table = str.maketrans("éèêàïîôûùç", "eeea iouuc")
-    s = s.translate(table).replace(" ", "")
-    return s
-
-def map_columns(df: pd.DataFrame) -> dict:
-    low = {norm_key(c): c for c in df.columns}
-    def find(cands):
-        for c in cands:
-            k = norm_key(c)
-            if k in low:
-                return low[k]
-        # aussi: si l'utilisateur a déjà mis exactement ce nom
-        for kraw, orig in low.items():
-            if kraw in cands:
-                return orig
-        return None
-    cols = {}
-    cols["date"] = find(CAND_DATE)
-    cols["classe"] = find(CAND_CLASSE)
-    cols["chapitre"] = find(CAND_CHAP)
-    cols["titre"] = find(CAND_TITRE)
-    cols["resume"] = find(CAND_RESUME)
-    cols["lien"] = find(CAND_LIEN)
-    cols["pj"] = find(CAND_PJ)
-    # vérifs minimales
-    for need in ("date", "classe", "chapitre", "titre"):
-        if cols[need] is None:
-            raise SystemExit(f"Colonne requise manquante dans l'ODS: {need}")
-    return cols
-
 # ==============================
 # RENDER HTML
 # ==============================
@@ -155,15 +89,59 @@ def render_lien(url: str) -> str:
         return ""
     return f'<h2>Lien utile</h2><div class="card"><a href="{url}" target="_blank" rel="noopener">{url}</a></div>'
 
+def pieces_du_site(s) -> list:
+    """[(libellé, url)] : cellules de l'ODS déjà relatives au site (assets/5e/fiche1.pdf)."""
+    return [(p.replace("assets/", ""), f"/cours-de-maths/{p}") for p in s.pieces]
+
 def render_pieces(pieces: list) -> str:
     if not pieces:
         return '<div class="card"><p>Aucune pièce jointe.</p></div>'
     lis = []
-    for p in pieces:
-        label = p.replace("assets/", "")
-        lis.append(f'<li><a href="/cours-de-maths/{p}" target="_blank" rel="noopener">{label}</a></li>')
+    for label, url in pieces:
+        lis.append(f'<li><a href="{url}" target="_blank" rel="noopener">{label}</a></li>')
     return '<div class="card"><ul class="list">' + "\n".join(lis) + "</ul></div>"
 
+def ecrire_classe(classe: str, seances, out_dir: pathlib.Path, pieces_de=pieces_du_site) -> list:
+    """
+    Une page par séance datée + index.html de la classe.
+    pieces_de : séance -> [(libellé, url)] (construire.py : PJ copiées dans docs/assets/pj)
+    """
+    ensure_dir(out_dir)
+    generated = []
+    items_li = []
+
+    for s in seances:
+        if s.date is None:
+            continue
+        page_name = f"{s.nom_page}.html"
+        page_path = out_dir / page_name
+
+        html = SESSION_TEMPLATE.format(
+            style=PAGE_STYLE,
+            chapitre=s.chapitre,
+            titre=s.intitule,
+            date=s.date_iso,
+            classe=classe,
+            bloc_resume=render_resume(s.resume),
+            bloc_lien=render_lien(s.lien),
+            bloc_pieces=render_pieces(pieces_de(s)),
+        )
+        ecrire_texte(page_path, html)
+        generated.append(page_path)
+
+        items_li.append(
+            f'<li><a href="/cours-de-maths/classes/{classe}/{page_name}">{s.date_iso} — {s.chapitre} : {s.intitule}</a></li>'
+        )
+
+    # index.html de la classe
+    index_html = INDEX_CLASS_TEMPLATE.format(
+        style=PAGE_STYLE,
+        classe=classe,
+        items="\n".join(sorted(items_li, reverse=True)),
+    )
+    ecrire_texte(out_dir / "index.html", index_html)
+    return generated
+
 # ==============================
 # MAIN
 # ==============================
@@ -172,9 +150,10 @@ def main() -> int:
         print(f"[ERREUR] ODS introuvable: {ODS_PATH}")
         return 1
 
-    # lecture de la première feuille
-    df = pd.read_excel(ODS_PATH, sheet_name=0, engine="odf")
-    cols = map_columns(df)
+    # lecture de la première feuille (colonnes reconnues seulement)
+    df, cols = lire_feuille(ODS_PATH, champs=CHAMPS)
+    for need in manquants(cols, REQUIS):
+        raise SystemExit(f"Colonne requise manquante dans l'ODS: {need}")
 
     # filtrage classes
     df = df.copy()
@@ -186,63 +165,15 @@ def main() -> int:
         print("[INFO] Aucune ligne à générer pour les classes ciblées.")
         return 0
 
+    try:
+        prog = Progression(ODS_PATH.stem, seances_depuis_df(df, cols, strict=True), source=ODS_PATH)
+    except ValueError as e:
+        raise SystemExit(f"Date invalide sur une ligne ({e})")
+
     generated = []
     # regrouper par classe
-    for classe, sub in df.groupby("__classe__"):
-        out_dir = OUTPUT_DIR / classe
-        ensure_dir(out_dir)
-
-        items_li = []
-
-        for _, row in sub.iterrows():
-            try:
-                date = parse_date(row[cols["date"]])
-            except Exception as e:
-                raise SystemExit(f"Date invalide sur une ligne ({e})")
-
-            chapitre = str(row[cols["chapitre"]]).strip()
-            titre = str(row[cols["titre"]]).strip()
-
-            resume = ""
-            if cols["resume"] and pd.notna(row.get(cols["resume"], "")):
-                resume = str(row[cols["resume"]]).strip()
-
-            lien = ""
-            if cols["lien"] and pd.notna(row.get(cols["lien"], "")):
-                lien = str(row[cols["lien"]]).strip()
-
-            pieces = []
-            if cols["pj"]:
-                pieces = split_pieces(row.get(cols["pj"], ""))
-
-            slug = slugify(f"{chapitre}-{titre}")
-            page_name = f"{date}-{slug}.html"
-            page_path = out_dir / page_name
-
-            html = SESSION_TEMPLATE.format(
-                style=PAGE_STYLE,
-                chapitre=chapitre,
-                titre=titre,
-                date=date,
-                classe=classe,
-                bloc_resume=render_resume(resume),
-                bloc_lien=render_lien(lien),
-                bloc_pieces=render_pieces(pieces),
-            )
-            page_path.write_text(html, encoding="utf-8")
-            generated.append(page_path)
-
-            items_li.append(
-                f'<li><a href="/cours-de-maths/classes/{classe}/{page_name}">{date} — {chapitre} : {titre}</a></li>'
-            )
-
-        # index.html de la classe
-        index_html = INDEX_CLASS_TEMPLATE.format(
-            style=PAGE_STYLE,
-            classe=classe,
-            items="\n".join(sorted(items_li, reverse=True)),
-        )
-        (out_dir / "index.html").write_text(index_html, encoding="utf-8")
+    for classe, seances in prog.par_classe().items():
+        generated += ecrire_classe(classe, seances, OUTPUT_DIR / classe)
 
     print(f"[OK] Fichiers générés: {len(generated)}")
     return 0
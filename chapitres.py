@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Pages par chapitre, toutes classes et tous établissements confondus.
+- docs/chapitres/<slug>.html : toutes les séances (et PJ) d'un chapitre, groupées par classe
+- docs/chapitres/index.html  : liste des chapitres
+- docs/chapitres/_index.json : index chapitre <- séances, par classe
+  (empreinte de la progression + empreinte de chaque séance, cf. modele)
+Chapitres regroupés sur leur nom normalisé (entetes.normaliser : casse, accents, espaces) :
+"Thalès", "thalès" et "Thales " ne font qu'une page, titrée par l'orthographe la plus fréquente.
+Mise à jour incrémentale : une classe dont l'empreinte n'a pas changé n'est pas traitée ;
+pour une classe modifiée, seuls les chapitres dont l'ensemble de séances a changé
+sont ré-rendus, à partir de l'index (aucune relecture des autres classes).
+Alimenté par la sortie "chapitres" de construire.py.
+"""
+
+import json
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+import export_progression_public as export
+from ecriture_atomique import ecrire_texte, existe, lire_texte, supprimer
+from entetes import normaliser
+from modele import slugify
+
+# ========= CONFIG =========
+CHAPITRES_DIR = export.REPO / "docs" / "chapitres"
+INDEX_JSON = CHAPITRES_DIR / "_index.json"
+SOMMAIRE_HTML = CHAPITRES_DIR / "index.html"
+
+STYLE = """
+body { font-family: system-ui, -apple-system, "Segoe UI", Roboto, "Helvetica Neue", Arial, "Noto Sans"; line-height:1.5; margin:24px; }
+h1 { font-size: 2rem; margin-bottom: .25rem; }
+h2 { margin-top: 28px; }
+p.lead { color:#444; margin-top:0; }
+table { border-collapse: collapse; width: 100%; }
+th, td { border: 1px solid #eee; padding: 12px; }
+th { background: #f5f589; text-align: left; }
+tbody tr:nth-child(even){ background: #fbfbfb; }
+a { color:#0044cc; text-decoration:none } a:hover { text-decoration:underline }
+"""
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<style>{style}</style>
+</head>
+<body>
+<p><a href="index.html">← Tous les chapitres</a></p>
+<h1>{title}</h1>
+<p class="lead">{lead}</p>
+{sections}
+<p style="margin-top:16px;color:#666;">Dernière mise à jour automatique le {now_fr}.</p>
+</body>
+</html>
+"""
+
+SECTION_TEMPLATE = """<h2>{etab} — <a href="{url}">{classe}</a></h2>
+<table>
+  <thead><tr><th>Séance</th><th>Contenu de la séance</th><th>Pièce jointe</th></tr></thead>
+  <tbody>
+    {rows_html}
+  </tbody>
+</table>"""
+
+SOMMAIRE_TEMPLATE = """<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Chapitres</title>
+<style>{style}</style>
+</head>
+<body>
+<h1>Chapitres</h1>
+<ul>
+{items}
+</ul>
+</body>
+</html>
+"""
+
+
+def cle_chapitre(chapitre: str) -> str:
+    return normaliser(chapitre)
+
+
+def page_chapitre(cle: str) -> Path:
+    return CHAPITRES_DIR / f"{slugify(cle) or 'chapitre'}.html"
+
+
+# ========= INDEX =========
+
+def charger() -> dict:
+    """classe -> {etab, titre, url, empreinte, seances: [{e, date, chapitre, texte, pj}]}"""
+    if not existe(INDEX_JSON):
+        return {}
+    try:
+        return json.loads(lire_texte(INDEX_JSON))
+    except ValueError:
+        return {}
+
+
+def _pieces(s, code: str) -> list:
+    """[[nom, url], ...] des PJ publiées (copie/déduplication via le manifeste de l'export)."""
+    return [list(p) for p in export.pieces_publiees(s, code)]
+
+
+def entree_classe(prog, url: str, ancienne: dict | None) -> dict:
+    """Entrée d'index d'une classe ; les séances déjà indexées (même empreinte) sont reprises telles quelles."""
+    connues = {l["e"]: l for l in (ancienne or {}).get("seances", ())}
+    lignes = []
+    for s in prog.seances:
+        if not s.chapitre:
+            continue
+        e = s.empreinte()
+        ligne = connues.get(e)
+        if ligne is None:
+            ligne = {"e": e, "date": s.date_iso, "chapitre": s.chapitre, "texte": s.intitule,
+                     "pj": _pieces(s, prog.code)}
+        lignes.append(ligne)
+    return {"etab": prog.etab, "titre": prog.titre, "url": url, "empreinte": prog.empreinte(), "seances": lignes}
+
+
+def _par_chapitre(entree: dict | None) -> dict:
+    groupes = {}
+    for l in (entree or {}).get("seances", ()):
+        groupes.setdefault(cle_chapitre(l["chapitre"]), set()).add(l["e"])
+    return groupes
+
+
+def chapitres_modifies(ancienne: dict | None, nouvelle: dict) -> set:
+    """Clés des chapitres dont l'ensemble de séances de cette classe a changé."""
+    avant, apres = _par_chapitre(ancienne), _par_chapitre(nouvelle)
+    if ancienne and (ancienne["etab"], ancienne["url"]) != (nouvelle["etab"], nouvelle["url"]):
+        return avant.keys() | apres.keys()     # en-têtes de section à refaire partout
+    return {ch for ch in avant.keys() | apres.keys() if avant.get(ch) != apres.get(ch)}
+
+
+# ========= RENDU =========
+
+def _rows_html(lignes) -> str:
+    rows = []
+    for l in lignes:
+        date_fr = datetime.strptime(l["date"], "%Y-%m-%d").strftime("%d/%m/%Y") if l["date"] else ""
+        pj = " ".join(f'<a href="{url}" target="_blank" rel="noopener">{nom}</a>' for nom, url in l["pj"])
+        rows.append(f"<tr><td>{date_fr}</td><td>{l['texte']}</td><td>{pj}</td></tr>")
+    return "\n".join(rows)
+
+
+def _titre(graphies: Counter) -> str:
+    """Orthographe la plus fréquente (à égalité : la première dans l'ordre alphabétique)."""
+    return min(graphies, key=lambda g: (-graphies[g], g))
+
+
+def rendre_chapitre(cle: str, index: dict) -> str:
+    sections, graphies = [], Counter()
+    for code, entree in sorted(index.items(), key=lambda kv: (kv[1]["etab"], kv[0])):
+        lignes = [l for l in entree["seances"] if cle_chapitre(l["chapitre"]) == cle]
+        if not lignes:
+            continue
+        graphies.update(l["chapitre"] for l in lignes)
+        sections.append(SECTION_TEMPLATE.format(etab=entree["etab"], classe=code, url=entree["url"],
+                                                rows_html=_rows_html(lignes)))
+    nb = sum(graphies.values())
+    return PAGE_TEMPLATE.format(
+        title=_titre(graphies),
+        lead=f"{nb} séance(s) dans {len(sections)} classe(s).",
+        sections="\n".join(sections),
+        now_fr=datetime.now().strftime("%d/%m/%Y %H:%M"),
+        style=STYLE,
+    )
+
+
+def rendre_sommaire(index: dict) -> str:
+    graphies = {}       # clé -> Counter des orthographes
+    for entree in index.values():
+        for l in entree["seances"]:
+            graphies.setdefault(cle_chapitre(l["chapitre"]), Counter())[l["chapitre"]] += 1
+    items = "\n".join(f'<li><a href="{page_chapitre(cle).name}">{_titre(g)}</a> ({sum(g.values())} séance(s))</li>'
+                      for cle, g in sorted(graphies.items()))
+    return SOMMAIRE_TEMPLATE.format(items=items, style=STYLE)
+
+
+# ========= MISE A JOUR =========
+
+def mettre_a_jour(progressions, url_de) -> list:
+    """
+    Met à jour l'index pour les progressions reçues et ré-rend les seuls chapitres touchés.
+    url_de : progression -> URL de sa page (lien de chaque section vers la progression de la classe)
+    """
+    index = charger()
+    touches = set()
+    for p in progressions:
+        ancienne = index.get(p.code)
+        if ancienne and ancienne["empreinte"] == p.empreinte() and ancienne["url"] == url_de(p):
+            continue
+        nouvelle = entree_classe(p, url_de(p), ancienne)
+        touches |= chapitres_modifies(ancienne, nouvelle)
+        index[p.code] = nouvelle
+    export.manifeste().sauver()
+    if not touches and existe(SOMMAIRE_HTML):
+        return []
+
+    produits = []
+    presents = {cle_chapitre(l["chapitre"]) for e in index.values() for l in e["seances"]}
+    for cle in sorted(touches):
+        page = page_chapitre(cle)
+        if cle in presents:
+            ecrire_texte(page, rendre_chapitre(cle, index))
+            produits.append(page)
+        elif existe(page) and not any(page_chapitre(c) == page for c in presents):
+            supprimer(page)     # plus aucune séance pour ce chapitre (à la bascule)
+    ecrire_texte(SOMMAIRE_HTML, rendre_sommaire(index))
+    ecrire_texte(INDEX_JSON, json.dumps(index, ensure_ascii=False, indent=1, sort_keys=True))
+    return produits + [SOMMAIRE_HTML, INDEX_JSON]
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+r"""
+Construction unifiée du site : chaque ODS est lu UNE fois, puis la Progression
+obtenue est distribuée à toutes les sorties enregistrées.
+Sorties (plugins, cf. @sortie) :
+- progression : tableau HTML par classe   docs/progressions/<niveau>/<classe>.html
+- seances     : une page HTML par séance  docs/classes/<classe>/<date>-<slug>.html
+- markdown    : une page .md par séance   classes/<classe>/<date>-<slug>.md
+- classes     : liste des classes         docs/progressions/_classes.json
+                (fusionnée avec l'existant, amorcée par les liens de docs/index.html)
+- index       : page d'accueil            docs/index.html (une section par établissement,
+                cf. "etablissement" dans export.CLASSES)
+- recherche   : index de recherche        docs/progressions/_recherche.json
+- chapitres   : une page par chapitre     docs/chapitres/<chapitre>.html (toutes classes, cf. chapitres.py)
+- analyse     : jeu colonnaire (Parquet)  analyse/seances/... + analyse/seances.arrow (cf. analyse.py)
+Coût : 1 lecture par source, quel que soit le nombre de sorties.
+Toutes les sorties d'une construction sont préparées hors de docs/ puis basculées
+ensemble à la fin (ecriture_atomique.Publication) : une erreur ne laisse aucune page tronquée.
+Une sortie en échec annule toute la bascule (pas de site à moitié à jour : index sans
+sa page, chapitres d'une version antérieure...) ; la construction suivante reprend tout.
+Filtre de date (export.FILTRE_DATE) : les sorties ne voient que les séances ≤ aujourd'hui ;
+la prochaine échéance de chaque classe est enregistrée dans .etat/echeances.json
+(lue par la surveillance pour ne reconstruire que les classes concernées, au bon moment).
+Classes effectivement basculées : .etat/construites.json (la surveillance n'enregistre et ne publie
+qu'elles) ; code de sortie 1 dès qu'une classe demandée n'a pas pu être lue.
+
+Usage :
+  python construire.py                       # toutes les classes, toutes les sorties
+  python construire.py 302 407               # seulement ces classes
+  python construire.py --sorties progression,index
+"""
+
+import argparse
+import html
+import json
+import re
+import sys
+import time
+from datetime import datetime
+from urllib.parse import quote
+
+import analyse
+import chapitres
+import export_progression_public as export
+import build_site
+import publish_selection
+from ecriture_atomique import Publication, ecrire_texte, existe, lire_texte
+from fenetre_dates import Echeancier, appliquer_fenetre
+
+# ========= CONFIG =========
+REPO = export.REPO
+DOCS_DIR = REPO / "docs"
+SEANCES_DIR = DOCS_DIR / "classes"
+MARKDOWN_DIR = REPO / "classes"
+CLASSES_JSON = export.PAGES_DIR / "_classes.json"
+RECHERCHE_JSON = export.PAGES_DIR / "_recherche.json"
+INDEX_HTML = DOCS_DIR / "index.html"
+ETAT_DIR = REPO / ".etat"                       # état local (non publié)
+ECHEANCES_JSON = ETAT_DIR / "echeances.json"
+CONSTRUITES_JSON = ETAT_DIR / "construites.json"
+
+INDEX_TEMPLATE = """<!doctype html>
+<html lang="fr"><head><meta charset="utf-8">
+<title>Cours de mathématiques — Progressions</title>
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<style>
+body{{font-family:system-ui,Segoe UI,Roboto,Arial,sans-serif;margin:0}}
+.container{{max-width:1000px;margin:40px auto;padding:0 16px}}
+h1{{font-weight:800}} h2{{margin-top:28px}}
+ul{{line-height:1.7}}
+a{{color:#0044cc;text-decoration:none}} a:hover{{text-decoration:underline}}
+hr{{border:none;border-top:1px solid #eee;margin:20px 0}}
+</style></head>
+<body><div class="container">
+<h1>Cours de mathématiques — Progressions</h1>
+{sections}
+</div></body></html>
+"""
+
+# page d'accueil existante (amorce de _classes.json) : <h2>établissement</h2><ul><li><strong>classe</strong> ... href
+RE_SECTION = re.compile(r"<h2>(.*?)</h2>\s*<ul>(.*?)</ul>", re.DOTALL)
+RE_LIEN_CLASSE = re.compile(r'<li><strong>(.*?)</strong>.*?href="([^"?]*)')
+
+# ========= REGISTRE DES SORTIES =========
+
+# nom -> fonction(progressions: list[Progression]) -> list[Path]
+SORTIES = {}
+
+def sortie(nom: str):
+    """Enregistre une sortie : elle reçoit toutes les progressions lues, une seule fois."""
+    def deco(f):
+        SORTIES[nom] = f
+        return f
+    return deco
+
+
+def url_progression(prog) -> str:
+    rel = export.page_progression(prog).relative_to(DOCS_DIR).as_posix()
+    return f"/cours-de-maths/{quote(rel)}"
+
+
+def pieces_de(prog):
+    """séance -> [(nom, url)] des PJ copiées dans docs/assets/pj (jamais la cellule brute de l'ODS)."""
+    return lambda s: export.pieces_publiees(s, prog.code)
+
+
+def classes_de_l_index() -> list:
+    """Classes déjà listées sur la page d'accueil (publiées avant _classes.json ou hors de celui-ci)."""
+    if not existe(INDEX_HTML):
+        return []
+    entrees = []
+    for etab, liste in RE_SECTION.findall(lire_texte(INDEX_HTML)):
+        for classe, href in RE_LIEN_CLASSE.findall(liste):
+            entrees.append({"etab": html.unescape(etab).strip(), "classe": html.unescape(classe).strip(),
+                            "url": f"/cours-de-maths/{href.removeprefix('/cours-de-maths/')}"})
+    return entrees
+
+
+@sortie("progression")
+def sortie_progression(progressions) -> list:
+    return [export.ecrire_progression(p) for p in progressions]
+
+
+@sortie("seances")
+def sortie_seances(progressions) -> list:
+    produits = []
+    for p in progressions:
+        produits += build_site.ecrire_classe(p.code, p.seances, SEANCES_DIR / p.code, pieces_de(p))
+    return produits
+
+
+@sortie("markdown")
+def sortie_markdown(progressions) -> list:
+    for p in progressions:
+        publish_selection.ecrire_seances_md(p.seances, MARKDOWN_DIR, pieces_de(p))
+    if MARKDOWN_DIR.exists():
+        publish_selection.ecrire_index_md(MARKDOWN_DIR)
+    return [MARKDOWN_DIR / p.code for p in progressions]
+
+
+@sortie("classes")
+def sortie_classes(progressions) -> list:
+    # fusion avec la page d'accueil et la liste existantes : une construction (partielle ou
+    # la première) ne retire aucune des classes déjà publiées
+    entrees = {}
+    anciennes = classes_de_l_index()
+    if existe(CLASSES_JSON):
+        anciennes += json.loads(lire_texte(CLASSES_JSON))
+    for e in anciennes:
+        entrees[(e["etab"], e["classe"])] = e
+    for p in progressions:
+        etab = export.etablissement(p)
+        entrees[(etab, p.code)] = {"etab": etab, "classe": p.code, "url": url_progression(p)}
+    ecrire_texte(CLASSES_JSON, json.dumps(sorted(entrees.values(), key=lambda e: (e["etab"], e["classe"])),
+                                          ensure_ascii=False, indent=2))
+    return [CLASSES_JSON]
+
+
+@sortie("index")
+def sortie_index(progressions) -> list:
+    # construit après "classes" : repose sur _classes.json (toutes les classes connues)
+    entrees = json.loads(lire_texte(CLASSES_JSON)) if existe(CLASSES_JSON) else []
+    version = datetime.now().strftime("%Y%m%d%H%M%S")
+    par_etab = {}
+    for e in entrees:
+        par_etab.setdefault(e["etab"], []).append(e)
+    sections = []
+    for etab, liste in par_etab.items():
+        lis = "\n".join(
+            f'<li><strong>{e["classe"]}</strong> — <a href="{e["url"].removeprefix("/cours-de-maths/")}?v={version}">Voir la progression</a></li>'
+            for e in liste)
+        sections.append(f"<h2>{etab}</h2>\n<ul>\n{lis}\n</ul><hr>")
+    ecrire_texte(INDEX_HTML, INDEX_TEMPLATE.format(sections="\n".join(sections)))
+    return [INDEX_HTML]
+
+
+@sortie("recherche")
+def sortie_recherche(progressions) -> list:
+    codes = {p.code for p in progressions}
+    docs = []
+    if existe(RECHERCHE_JSON):
+        docs = [d for d in json.loads(lire_texte(RECHERCHE_JSON)) if d["classe"] not in codes]
+    for p in progressions:
+        url = url_progression(p)
+        for s in p.seances:
+            docs.append({"etab": p.etab, "classe": p.code, "date": s.date_iso,
+                         "chapitre": s.chapitre, "texte": s.intitule, "url": url})
+    ecrire_texte(RECHERCHE_JSON, json.dumps(docs, ensure_ascii=False))
+    return [RECHERCHE_JSON]
+
+
+@sortie("chapitres")
+def sortie_chapitres(progressions) -> list:
+    # index chapitre <- séances mis à jour pour les classes modifiées, seuls les chapitres touchés sont rendus
+    return chapitres.mettre_a_jour(progressions, url_progression)
+
+
+@sortie("analyse")
+def sortie_analyse(progressions) -> list:
+    # seules les classes dont l'empreinte a changé sont réécrites (pyarrow optionnel)
+    return analyse.mettre_a_jour(progressions)
+
+
+# ========= CONSTRUCTION =========
+
+def lire_sources(codes=None) -> list:
+    """Lit chaque ODS une seule fois -> liste de Progression."""
+    progressions = []
+    for code, spec in export.CLASSES.items():
+        if codes and code not in codes:
+            continue
+        try:
+            progressions.append(export.lire_progression(code, spec))
+        except Exception as e:
+            export.log(f"ERREUR lecture {code}: {e}")
+    return progressions
+
+
+def noter_construites(codes) -> None:
+    """Classes dont les sorties ont été basculées par cette construction (écrit hors Publication)."""
+    ecrire_texte(CONSTRUITES_JSON, json.dumps(sorted(codes)))
+
+
+def construire(codes=None, sorties=None) -> int:
+    t0 = time.perf_counter()
+    progressions = lire_sources(codes)
+    illisibles = sorted(set(codes or export.CLASSES) - {p.code for p in progressions})
+    if not progressions:
+        export.log("Aucune source lue.")
+        noter_construites([])
+        return 1
+    export.log(f"{len(progressions)} source(s) lue(s) en {time.perf_counter() - t0:.2f}s")
+
+    echeancier = Echeancier(ECHEANCES_JSON)
+    if export.FILTRE_DATE:
+        fenetres = [appliquer_fenetre(p) for p in progressions]
+        progressions = [p for p, _ in fenetres]
+        for p, echeance in fenetres:
+            echeancier.mettre_a_jour(p.code, echeance)
+
+    erreurs = 0
+    with Publication(REPO) as pub:
+        ecrire_texte(ECHEANCES_JSON, echeancier.en_json())
+        for nom, f in SORTIES.items():
+            if sorties and nom not in sorties:
+                continue
+            t1 = time.perf_counter()
+            try:
+                produits = f(progressions)
+                export.log(f"[{nom}] {len(produits)} fichier(s) en {time.perf_counter() - t1:.2f}s")
+            except Exception as e:
+                erreurs += 1
+                export.log(f"ERREUR sortie {nom}: {e}")
+        if erreurs:
+            pub.abandonner()
+    if erreurs:
+        export.log(f"{erreurs} sortie(s) en échec : rien n'est basculé, docs/ inchangé")
+        noter_construites([])
+        return 1
+    export.log(f"{len(pub.remplaces)} fichier(s) modifié(s) basculé(s), {len(pub.retires)} supprimé(s)")
+    noter_construites(p.code for p in progressions)
+    if illisibles:
+        export.log(f"Classe(s) non construite(s) (lecture en échec) : {', '.join(illisibles)}")
+        return 1
+    return 0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Construit toutes les sorties en une seule lecture des ODS.")
+    ap.add_argument("classes", nargs="*", help="codes de classes (défaut : toutes)")
+    ap.add_argument("--sorties", help=f"liste séparée par des virgules parmi : {', '.join(SORTIES)}")
+    args = ap.parse_args(argv)
+    sorties = set(args.sorties.split(",")) if args.sorties else None
+    if sorties and sorties - SORTIES.keys():
+        ap.error(f"sortie(s) inconnue(s) : {', '.join(sorted(sorties - SORTIES.keys()))}")
+    inconnues = set(args.classes) - export.CLASSES.keys()
+    if inconnues:
+        ap.error(f"classe(s) absente(s) de export_progression_public.CLASSES : {', '.join(sorted(inconnues))}")
+    return construire(set(args.classes) or None, sorties)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Copie rapide des pièces jointes (dossiers Drive synchronisés souvent lents à lire).
+- Copieur : pool de threads ; les copies d'une classe sont lancées d'un coup
+  -> durée ≈ celle du fichier le plus lent
+- Méthode la plus rapide disponible, dans l'ordre :
+    reflink (ioctl FICLONE : copie à la demande, Btrfs/XFS)
+    os.copy_file_range (copie dans le noyau, sans aller-retour en espace utilisateur)
+    lien dur (même disque ; seulement si LIENS_DURS)
+    shutil.copyfile (octet par octet)
+  Un échec (système de fichiers ou disque différent) n'est retenu que pour la paire de disques concernée.
+- Écriture dans un fichier temporaire voisin puis os.replace : deux copies vers la même cible
+  ne s'entremêlent jamais (compatible avec l'arbre préparé d'ecriture_atomique.Publication).
+- copier_avec_empreinte : copie octet par octet qui calcule le sha256 au passage, pour une source
+  dont l'empreinte n'est pas connue (une seule lecture au lieu de hachage + copie).
+- Débit affiché en fin de lot (Copieur.rapport).
+"""
+
+import errno
+import hashlib
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# ========= CONFIG =========
+MAX_WORKERS = 8              # lectures simultanées (I/O : indépendant du nombre de CPU)
+# Lien dur : aucune donnée copiée, mais le fichier publié PARTAGE le contenu de la source ;
+# une modification sur place de la source (synchro Drive...) changerait docs/ sans passer par le manifeste.
+LIENS_DURS = False
+FICLONE = 0x40049409         # linux/fs.h
+BLOC = 1 << 30               # octets par appel à copy_file_range
+BLOC_LECTURE = 1 << 20       # octets par lecture de copier_avec_empreinte
+
+# erreurs signifiant "méthode non prise en charge ici" (et non "fichier illisible")
+NON_PRIS_EN_CHARGE = {errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.ENOSYS, errno.EPERM}
+
+_echecs = set()              # (méthode, disque source, disque cible) à ne plus essayer
+_verrou_echecs = threading.Lock()
+
+
+def _reflink(src: Path, dst: Path) -> None:
+    if fcntl is None:
+        raise OSError("FICLONE indisponible")
+    with open(src, "rb") as fs, open(dst, "wb") as fd:
+        fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+
+
+def _copy_file_range(src: Path, dst: Path) -> None:
+    if not hasattr(os, "copy_file_range"):
+        raise OSError("copy_file_range indisponible")
+    with open(src, "rb") as fs, open(dst, "wb") as fd:
+        restant = os.fstat(fs.fileno()).st_size
+        while restant > 0:
+            n = os.copy_file_range(fs.fileno(), fd.fileno(), min(restant, BLOC))
+            if n == 0:
+                raise OSError("copy_file_range : copie incomplète")
+            restant -= n
+
+
+def _lien_dur(src: Path, dst: Path) -> None:
+    if not LIENS_DURS:
+        raise OSError("liens durs désactivés")
+    os.link(src, dst)
+
+
+def _copie(src: Path, dst: Path) -> None:
+    shutil.copyfile(src, dst)
+
+
+METHODES = (("reflink", _reflink), ("copy_file_range", _copy_file_range),
+            ("lien_dur", _lien_dur), ("copie", _copie))
+
+
+def _disque(path: Path) -> int:
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return -1
+
+
+def copier_fichier(src, dst) -> str:
+    """Copie src -> dst (remplacement atomique, métadonnées comme copy2) ; -> méthode utilisée."""
+    src, dst = Path(src), Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".{dst.name}.{threading.get_ident()}.tmp")
+    disques = (_disque(src), _disque(dst.parent))
+    for nom, methode in METHODES:
+        if (nom, *disques) in _echecs:
+            continue
+        try:
+            methode(src, tmp)
+        except OSError as e:
+            if tmp.exists():
+                tmp.unlink()
+            if nom == "copie":
+                raise
+            if e.errno is None or e.errno in NON_PRIS_EN_CHARGE:
+                with _verrou_echecs:
+                    _echecs.add((nom, *disques))
+            continue
+        if nom != "lien_dur":
+            shutil.copystat(src, tmp)
+        os.replace(tmp, dst)
+        return nom
+    raise OSError(f"Copie impossible : {src}")
+
+
+def copier_avec_empreinte(src, dst) -> str:
+    """Copie src -> dst (remplacement atomique, métadonnées comme copy2) en une lecture ; -> sha256."""
+    src, dst = Path(src), Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".{dst.name}.{threading.get_ident()}.tmp")
+    h = hashlib.sha256()
+    try:
+        with open(src, "rb") as fs, open(tmp, "wb") as fd:
+            while bloc := fs.read(BLOC_LECTURE):
+                h.update(bloc)
+                fd.write(bloc)
+        shutil.copystat(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        if tmp.exists():
+            tmp.unlink()
+        raise
+    return h.hexdigest()
+
+
+def taille_lisible(n: float) -> str:
+    for unite in ("o", "Ko", "Mo", "Go"):
+        if n < 1024 or unite == "Go":
+            return f"{n:.0f} {unite}" if unite == "o" else f"{n:.1f} {unite}"
+        n /= 1024
+
+
+class Copieur:
+    """
+    Pool de copies pour un lot (une classe) :
+        with Copieur() as copieur:
+            f = copieur.soumettre(tache, ...)     # démarre tout de suite
+            f.result()                            # attend la plus lente, pas leur somme
+        log(copieur.rapport())
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="copie-pj")
+        self._verrou = threading.Lock()
+        self.octets = 0
+        self.nb = 0
+        self.methodes = {}
+        self.debut = time.perf_counter()
+        self.duree = 0.0
+
+    def soumettre(self, fn, *args, **kwargs):
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def _compter(self, methode: str, dst) -> None:
+        taille = os.stat(dst).st_size
+        with self._verrou:
+            self.nb += 1
+            self.octets += taille
+            self.methodes[methode] = self.methodes.get(methode, 0) + 1
+
+    def copier(self, src, dst) -> str:
+        """copier_fichier avec comptage (appelé depuis les threads du pool)."""
+        methode = copier_fichier(src, dst)
+        self._compter(methode, dst)
+        return methode
+
+    def copier_avec_empreinte(self, src, dst) -> str:
+        """copier_avec_empreinte avec comptage ; -> sha256."""
+        sha = copier_avec_empreinte(src, dst)
+        self._compter("copie+sha256", dst)
+        return sha
+
+    def fermer(self) -> None:
+        self._pool.shutdown(wait=True)
+        self.duree = time.perf_counter() - self.debut
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.fermer()
+        return False
+
+    def rapport(self) -> str:
+        debit = self.octets / self.duree if self.duree else 0
+        detail = ", ".join(f"{m}: {n}" for m, n in sorted(self.methodes.items()))
+        return (f"{self.nb} PJ copiée(s), {taille_lisible(self.octets)} en {self.duree:.2f}s "
+                f"({taille_lisible(debit)}/s){' — ' + detail if detail else ''}")
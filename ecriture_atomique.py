@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+Écritures atomiques dans docs/ (pas de pages à moitié écrites publiées par git).
+- Publication : toutes les sorties d'une construction sont écrites dans un arbre
+  temporaire (.construction-XXXX/, même disque que docs/), synchronisées sur disque
+  en une seule passe (fsync), puis basculées fichier par fichier avec os.replace.
+  Seuls les fichiers réellement modifiés sont remplacés (mtime et git inchangés sinon).
+- verrou_docs() : verrou inter-processus pris pendant la bascule ET pendant
+  'git add/commit' -> git lit toujours un état cohérent de docs/.
+- ecrire_texte / copier / lire_texte / supprimer : à utiliser par les générateurs à la place de
+  write_text / shutil.copy2 / unlink. Hors Publication active : fichier temporaire + os.replace.
+  Publication.chemin() peut être appelé depuis plusieurs threads (copies de PJ en parallèle).
+- destination() : chemin à écrire soi-même (outil externe, processus du pool d'aperçus) ;
+  un fichier préparé qui n'a finalement pas été écrit est ignoré à la bascule.
+- Une sortie en échec peut annuler la bascule (Publication.abandonner) : docs/ reste intact.
+"""
+
+import filecmp
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# ========= CONFIG =========
+VERROU_NOM = ".docs.lock"
+VERROU_ATTENTE = 120        # secondes max pour obtenir le verrou
+VERROU_PERIME = 600         # un verrou plus vieux est considéré abandonné (processus tué)
+
+_active = None              # Publication en cours dans ce processus
+
+
+@contextmanager
+def verrou_docs(racine: Path, attente: float = VERROU_ATTENTE):
+    """Verrou exclusif (fichier créé en O_EXCL) partagé entre construction et publication git."""
+    chemin = Path(racine) / VERROU_NOM
+    debut = time.monotonic()
+    while True:
+        try:
+            fd = os.open(chemin, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - chemin.stat().st_mtime > VERROU_PERIME:
+                    chemin.unlink()
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() - debut > attente:
+                raise TimeoutError(f"Verrou occupé : {chemin}")
+            time.sleep(0.2)
+    try:
+        yield
+    finally:
+        try:
+            chemin.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _ecrire_direct(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+class Publication:
+    """
+    Arbre de préparation d'une construction.
+        with Publication(REPO):
+            ecrire_texte(docs / "x.html", html)   # -> .construction-XXXX/docs/x.html
+        # sortie du with : fsync groupé puis bascule atomique des fichiers modifiés
+    Exception dans le with (ou abandonner()) : rien n'est basculé, docs/ reste dans l'état précédent.
+    """
+
+    def __init__(self, racine: Path):
+        self.racine = Path(racine).resolve()
+        self.staging = None
+        self.fichiers = {}          # chemin final -> chemin préparé
+        self.supprimes = set()      # chemins finaux à supprimer à la bascule
+        self.remplaces = []         # chemins finaux effectivement modifiés
+        self.retires = []           # chemins finaux effectivement supprimés
+        self.abandonnee = False
+
+    def __enter__(self):
+        global _active
+        self.staging = Path(tempfile.mkdtemp(prefix=".construction-", dir=self.racine))
+        _active = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _active
+        _active = None
+        try:
+            if exc_type is None and not self.abandonnee:
+                self.valider()
+        finally:
+            shutil.rmtree(self.staging, ignore_errors=True)
+        return False
+
+    def chemin(self, final: Path) -> Path:
+        final = Path(final).resolve()
+        rel = final.relative_to(self.racine)
+        prepare = self.staging / rel
+        prepare.parent.mkdir(parents=True, exist_ok=True)
+        self.fichiers[final] = prepare
+        self.supprimes.discard(final)
+        return prepare
+
+    def supprimer(self, final: Path) -> None:
+        final = Path(final).resolve()
+        final.relative_to(self.racine)
+        prepare = self.fichiers.pop(final, None)
+        if prepare is not None and prepare.exists():
+            prepare.unlink()
+        self.supprimes.add(final)
+
+    def abandonner(self) -> None:
+        """La sortie du with ne basculera rien (arbre préparé jeté)."""
+        self.abandonnee = True
+
+    def valider(self) -> list:
+        # fichiers réservés par destination() mais jamais écrits (aperçu en échec...)
+        self.fichiers = {f: p for f, p in self.fichiers.items() if p.exists()}
+        # 1) une seule passe de fsync sur tout l'arbre préparé
+        for prepare in self.fichiers.values():
+            if os.stat(prepare).st_nlink > 1:
+                continue        # lien dur vers une source déjà sur disque (copie_pj.LIENS_DURS)
+            with open(prepare, "rb+") as f:
+                os.fsync(f.fileno())
+        # 2) bascule des seuls fichiers modifiés, sous verrou (git ne voit jamais d'état intermédiaire)
+        with verrou_docs(self.racine):
+            for final, prepare in self.fichiers.items():
+                if final.exists() and filecmp.cmp(prepare, final, shallow=False):
+                    continue
+                final.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(prepare, final)
+                self.remplaces.append(final)
+            for final in sorted(self.supprimes):
+                if final.exists():
+                    final.unlink()
+                    self.retires.append(final)
+        return self.remplaces
+
+
+def ecrire_octets(path: Path, data: bytes) -> None:
+    if _active is not None:
+        _active.chemin(path).write_bytes(data)
+    else:
+        _ecrire_direct(Path(path), data)
+
+
+def ecrire_texte(path: Path, text: str) -> None:
+    ecrire_octets(path, text.encode("utf-8"))
+
+
+def copier(src: Path, dst: Path, copie=shutil.copy2) -> None:
+    """copie(src, dst) vers l'arbre préparé (ou copie atomique hors Publication), cf. copie_pj.copier_fichier."""
+    if _active is not None:
+        copie(src, _active.chemin(dst))
+        return
+    dst = Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{dst.name}.", suffix=".tmp", dir=dst.parent)
+    os.close(fd)
+    try:
+        copie(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def supprimer(path: Path) -> None:
+    """Suppression à la bascule (immédiate hors Publication)."""
+    if _active is not None:
+        _active.supprimer(path)
+    else:
+        Path(path).unlink(missing_ok=True)
+
+
+def destination(path: Path) -> Path:
+    """Chemin où écrire path soi-même : arbre préparé si une Publication est active."""
+    if _active is not None:
+        return _active.chemin(path)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def lire_texte(path: Path) -> str:
+    """Lit la version préparée si elle existe (écrite plus tôt dans la même construction)."""
+    if _active is not None:
+        prepare = _active.fichiers.get(Path(path).resolve())
+        if prepare is not None:
+            return prepare.read_text(encoding="utf-8")
+    return Path(path).read_text(encoding="utf-8")
+
+
+def existe(path: Path) -> bool:
+    if _active is not None:
+        final = Path(path).resolve()
+        if final in _active.supprimes:
+            return False
+        prepare = _active.fichiers.get(final)
+        if prepare is not None and prepare.exists():
+            return True
+    return Path(path).exists()
+
+
+def lister(dossier: Path, motif: str = "*") -> list:
+    """glob du dossier final complété par les fichiers préparés (chemins finaux)."""
+    dossier = Path(dossier)
+    trouves = set(dossier.glob(motif)) if dossier.exists() else set()
+    if _active is not None:
+        base = dossier.resolve()
+        trouves |= {dossier / f.name for f in _active.fichiers
+                    if f.parent == base and f.match(motif)}
+        trouves = {f for f in trouves if f.resolve() not in _active.supprimes}
+    return sorted(trouves)
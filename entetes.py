@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Reconnaissance des en-têtes de colonnes, commune à tous les points d'entrée
+(export_progression_public.py, build_site.py, publish_selection.py, site Jinja).
+- SYNONYMES : champ du modèle -> noms acceptés, par ordre de préférence
+- Normalisation unique : minuscules, accents retirés (NFD), '_' / '-' / espaces multiples -> un espace
+  ("Séance ", "pièces_jointes", "Contenu de la séance" ...)
+- Table compilée une fois (nom normalisé -> (champ, rang)) ; la correspondance d'une ligne
+  d'en-têtes est mémorisée par son empreinte (tuple des en-têtes) : un même gabarit de feuille
+  n'est résolu qu'une fois par processus.
+- lire_feuille : lecture pandas limitée aux colonnes reconnues (usecols appelable),
+  les autres colonnes ne sont ni converties ni copiées.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+# ========= CONFIG =========
+# champ (cf. modele.seances_depuis_df) -> synonymes, du plus au moins prioritaire
+SYNONYMES = {
+    "date":     ("date", "seance", "jour"),
+    "classe":   ("classe",),
+    "chapitre": ("chapitre",),
+    "titre":    ("titre", "intitule"),
+    "contenu":  ("contenu", "contenu de la seance"),
+    "resume":   ("resume", "resumee", "description"),
+    "lien":     ("lien", "lien externe", "url"),
+    "pj":       ("piece jointe", "pieces jointes", "pieces jointess", "pj", "pieces", "piece"),
+}
+CHAMPS = tuple(SYNONYMES)
+
+
+@lru_cache(maxsize=1024)
+def normaliser(nom) -> str:
+    s = unicodedata.normalize("NFD", str(nom).strip().lower())
+    s = "".join(c for c in s if unicodedata.category(c) != "Mn")
+    return re.sub(r"[\s_\-]+", " ", s).strip()
+
+
+def _compiler(synonymes: dict) -> dict:
+    table = {}
+    for champ, noms in synonymes.items():
+        for rang, nom in enumerate(noms):
+            table.setdefault(normaliser(nom), (champ, rang))
+    return table
+
+_TABLE = _compiler(SYNONYMES)
+
+
+def champ(nom) -> str | None:
+    """Champ reconnu pour un en-tête (None : colonne ignorée)."""
+    trouve = _TABLE.get(normaliser(nom))
+    return trouve[0] if trouve else None
+
+
+@lru_cache(maxsize=64)
+def _resoudre(entetes: tuple) -> tuple:
+    meilleurs = {}      # champ -> (rang, en-tête)
+    for nom in entetes:
+        trouve = _TABLE.get(normaliser(nom))
+        if trouve is None:
+            continue
+        c, rang = trouve
+        if c not in meilleurs or rang < meilleurs[c][0]:
+            meilleurs[c] = (rang, nom)
+    return tuple((c, meilleurs[c][1] if c in meilleurs else None) for c in CHAMPS)
+
+
+def resoudre(entetes, champs=CHAMPS) -> dict:
+    """En-têtes d'une feuille (ou clés d'une ligne JSON) -> {champ: en-tête d'origine ou None}."""
+    resolu = dict(_resoudre(tuple(entetes)))
+    return {c: resolu[c] for c in champs}
+
+
+def manquants(cols: dict, requis) -> list:
+    return [c for c in requis if cols.get(c) is None]
+
+
+def lire_feuille(path, sheet_name=0, champs=CHAMPS):
+    """
+    Lit une feuille ODS en ne gardant que les colonnes reconnues pour 'champs'.
+    -> (DataFrame, {champ: colonne ou None})
+    sheet_name=None : première feuille (et non toutes les feuilles, comme pour pandas).
+    """
+    import pandas as pd
+    voulus = set(champs)
+    df = pd.read_excel(path, engine="odf", sheet_name=0 if sheet_name is None else sheet_name,
+                       usecols=lambda nom: champ(nom) in voulus)
+    return df, resoudre(df.columns, champs)
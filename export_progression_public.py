@@ -1,24 +1,37 @@
 # -*- coding: utf-8 -*-
 r"""
 Export .ods -> HTML pour GitHub Pages (publication dans docs/).
-- En-têtes tolérants : Séance -> Date, Contenu de la séance -> Contenu
+- En-têtes tolérants : Séance -> date, Contenu de la séance -> contenu (cf. entetes.py)
 - Dates texte acceptées : 28/10/2025, 28-10-25, 28.10.2025...
-- AUCUN FILTRE DE DATE : toutes les lignes de l'ODS sont affichées
+- Filtre de date (FILTRE_DATE) : seules les séances ≤ la date du jour sont publiées ;
+  la prochaine date de changement est calculée par fenetre_dates.py (pas de reconstruction quotidienne)
 - Tri par date croissante, dates manquantes à la fin
 - Copie PJ: docs/assets/pj/<classe> ; liens web sans préfixe 'docs/'
+  contenu déjà publié pour la classe (manifeste, cf. stock_pj.py) -> fichier existant réutilisé, pas de nouvelle copie
+- Écritures préparées hors de docs/ puis basculées atomiquement (cf. ecriture_atomique.py)
+- Aperçus PJ (images, 1re page des PDF) : docs/assets/apercus/<empreinte>.webp (cf. apercus.py)
+- Copies de PJ en parallèle (pool de threads, reflink/copy_file_range, cf. copie_pj.py) ; chaque copie
+  rend l'empreinte de la source, réutilisée pour les aperçus. Empreinte lue dans le cache du manifeste
+  (chemin, taille, mtime_ns) ; source nouvelle ou modifiée : hachée pendant sa copie (une seule lecture)
 """
 
+import os
 import re
 import sys
-import shutil
-import unicodedata
-from datetime import datetime, date
+import threading
+from datetime import datetime
 from pathlib import Path
 
-import pandas as pd
+from apercus import apercus_pour
+from copie_pj import Copieur, copier_avec_empreinte, copier_fichier
+from ecriture_atomique import Publication, copier, destination, ecrire_texte
+from entetes import lire_feuille, manquants
+from fenetre_dates import appliquer_fenetre
+from modele import Progression, seances_depuis_df
+from stock_pj import Manifeste
 
 # ========= DEBUG =========
-VERSION = "export_progression_public.py :: 2025-10-29 (docs/, no-date-filter)"
+VERSION = "export_progression_public.py :: 2025-10-29 (docs/, date-window)"
 DEBUG = True
 def dbg(msg: str):
     if DEBUG:
@@ -31,6 +44,7 @@ REPO = Path(r"C:\Users\Utilisateur\Desktop\cours-de-maths")
 # Publication dans docs/
 PAGES_DIR  = REPO / "docs" / "progressions"
 ASSETS_DIR = REPO / "docs" / "assets" / "pj"
+APERCUS_DIR = REPO / "docs" / "assets" / "apercus"
 
 CLASSES = {
     "407": {
@@ -38,10 +52,25 @@ CLASSES = {
         "ods": Path(r"C:\Users\Utilisateur\Mon Drive\Enseignement\College Montherlant 2025-2026\407\407_Progression.ods"),
         "sheet_name": None,  # première feuille
         "title": "Progression – 407",
+        "etablissement": "College Montherlant 2025-2026",   # section de la page d'accueil (défaut : level_subdir)
     },
     # Ajouter d'autres classes si besoin ...
 }
 
+# Séances publiées seulement à partir de leur date (False : toutes les lignes du tableur)
+FILTRE_DATE = True
+
+_manifeste = None
+_verrou_manifeste = threading.Lock()   # copies de PJ concurrentes (cf. build_rows_html)
+_en_copie = {}                         # (classe, sha256) -> "classe/nom" : copie lancée dans ce lot
+_publiees = {}                         # (classe, source) -> (nom, url) ou None ; une construction = un processus
+
+def manifeste() -> Manifeste:
+    global _manifeste
+    if _manifeste is None:
+        _manifeste = Manifeste(ASSETS_DIR / "_manifest.json", REPO / ".etat" / "empreintes_pj.json")
+    return _manifeste
+
 HTML_NAME = "{classe}.html"
 LINK_TEXT = "Télécharger"
 
@@ -50,6 +79,7 @@ table { border-collapse: collapse; width: 100%; }
 th, td { border: 1px solid #eee; padding: 12px; }
 th { background: #f5f589; text-align: left; }
 tbody tr:nth-child(even){ background: #fbfbfb; }
+img.apercu { display: block; max-width: 160px; max-height: 160px; border: 1px solid #eee; }
 """
 
 PAGE_TEMPLATE = """<!DOCTYPE html>
@@ -66,7 +96,7 @@ p.lead {{ color:#444; margin-top:0; }}
 </head>
 <body>
 <h1>{title}</h1>
-<p class="lead">Séances affichées automatiquement (toutes les lignes du tableur).</p>
+<p class="lead">{lead}</p>
 <table>
   <thead>
     <tr>
@@ -91,166 +121,206 @@ def ensure_dirs(*paths: Path) -> None:
     for p in paths:
         p.mkdir(parents=True, exist_ok=True)
 
-def to_fr_date(ts: pd.Timestamp | None) -> str:
-    if ts is None or pd.isna(ts):
-        return ""
-    return ts.strftime("%d/%m/%Y")
-
 def normalize_filename(name: str) -> str:
     s = re.sub(r"[^\w\-.]+", "_", name, flags=re.UNICODE)
     s = re.sub(r"_+", "_", s).strip("_")
     return s or "fichier"
 
-def _norm(s: str) -> str:
-    s = str(s).strip().lower()
-    s = ''.join(c for c in unicodedata.normalize('NFD', s) if unicodedata.category(c) != 'Mn')
-    s = re.sub(r"\s+", " ", s)
-    return s
-
-def coerce_date(v):
-    """pd.Timestamp ou NaT à partir de datetime, nombres Excel/Calc, ou texte 'dd/mm/yy' etc."""
-    if pd.isna(v):
-        return pd.NaT
-    if isinstance(v, (datetime, date)):
-        return pd.Timestamp(v)
-    s = str(v).strip()
-    if not s:
-        return pd.NaT
-    s_norm = s.replace(".", "/").replace("-", "/")
-    m = re.fullmatch(r"(\d{1,2})/(\d{1,2})/(\d{2})", s_norm)
-    if m:
-        d, mth, yy = map(int, m.groups())
-        yy = 2000 + yy if yy < 70 else 1900 + yy
-        s_norm = f"{d:02d}/{mth:02d}/{yy:04d}"
-    ts = pd.to_datetime(s_norm, dayfirst=True, errors="coerce")
-    if pd.notna(ts):
-        return ts
-    # Nombre Excel/LibreOffice (jours depuis 1899-12-30)
-    try:
-        n = float(str(v))
-        base = pd.Timestamp("1899-12-30")
-        return base + pd.to_timedelta(int(n), unit="D")
-    except Exception:
-        return pd.NaT
+# champs lus dans les ODS de progression (en-têtes reconnus par entetes.py)
+CHAMPS = ("date", "chapitre", "contenu", "pj")
 
-def read_ods_as_df(path: Path, sheet_name=None) -> pd.DataFrame:
+def read_ods_as_df(path: Path, sheet_name=None):
+    """-> (DataFrame réduit aux colonnes utiles, {champ: colonne ou None})"""
     if not path.exists():
         raise FileNotFoundError(str(path))
-    df = pd.read_excel(path, engine="odf", sheet_name=sheet_name)
-    if isinstance(df, dict):
-        df = df[list(df.keys())[0]]
-    return df
-
-def harmonize_headers(df: pd.DataFrame, code: str) -> pd.DataFrame:
-    present = { _norm(c): c for c in df.columns }
-    wanted = {
-        "date": "Date",
-        "seance": "Date",
-        "chapitre": "Chapitre",
-        "contenu de la seance": "Contenu",
-        "contenu": "Contenu",
-        "piece jointe": "Pièce jointe",
-        "pièce jointe": "Pièce jointe",
-    }
-    rename = {}
-    for norm_name, canon in wanted.items():
-        if norm_name in present:
-            rename[present[norm_name]] = canon
-    if rename:
-        df = df.rename(columns=rename)
-
-    expected = ["Date", "Chapitre", "Contenu", "Pièce jointe"]
-    missing = [c for c in expected if c not in df.columns]
-    if missing:
-        dbg(f"ATTENTION({code}) colonnes manquantes: {missing} | présentes: {list(df.columns)}")
-
-    keep = [c for c in expected if c in df.columns]
-    return df[keep].copy()
-
-def copy_attachment_to_repo(src: str, class_code: str) -> str | None:
-    if not src or str(src).strip() == "":
-        return None
-    p = Path(str(src))
-    if not p.exists():
-        return None
-    target_dir = ASSETS_DIR / class_code
-    ensure_dirs(target_dir)
-    target = target_dir / normalize_filename(p.name)
-    shutil.copy2(p, target)
+    return lire_feuille(path, sheet_name=sheet_name, champs=CHAMPS)
 
+def web_url(target: Path) -> str:
     # URL web sans préfixe 'docs/'
     web_rel = target.relative_to(REPO).as_posix()
     if web_rel.startswith("docs/"):
         web_rel = web_rel[len("docs/"):]
     return f"/cours-de-maths/{web_rel}"
 
-def build_rows_html(df: pd.DataFrame, class_code: str) -> str:
-    rows = []
-    for _, row in df.iterrows():
-        date_txt = to_fr_date(row.get("Date"))
-        chap     = row.get("Chapitre", "")
-        cont     = row.get("Contenu", "")
-        pj       = row.get("Pièce jointe", "")
-        url = None
-        try:
-            url = copy_attachment_to_repo(str(pj), class_code)
-        except Exception:
-            url = None
-        link_html = f'<a href="{url}" target="_blank" rel="noopener">{LINK_TEXT}</a>' if url else ""
-        rows.append(f"<tr><td>{date_txt}</td><td>{chap}</td><td>{cont}</td><td>{link_html}</td></tr>")
+def copy_attachment_to_repo(src: str, class_code: str, copieur: Copieur | None = None) -> tuple[Path, Path, str] | None:
+    """
+    (source, cible dans docs/, sha256 du contenu) ou None si la PJ est absente.
+    Appelable depuis plusieurs threads ; le sha256 sert aussi de clé au cache des aperçus.
+    """
+    if not src or str(src).strip() == "":
+        return None
+    p = Path(str(src))
+    if not p.exists():
+        return None
+    target = ASSETS_DIR / class_code / normalize_filename(p.name)
+    rel = f"{class_code}/{target.name}"
+    st = p.stat()
+    with _verrou_manifeste:
+        sha = manifeste().empreinte_source(p, st)
+    if sha is None:
+        return _copier_nouvelle_source(p, st, target, class_code, copieur)
+    # même contenu déjà publié (ou en cours de copie) pour cette classe
+    # (ex. copie horodatée d'un fichier inchangé) : on le réutilise
+    with _verrou_manifeste:
+        deja = manifeste().chercher(class_code, sha) or _en_copie.get((class_code, sha))
+        if deja is not None:
+            return p, ASSETS_DIR / deja, sha
+        _en_copie[(class_code, sha)] = rel
+    try:
+        copier(p, target, copie=copieur.copier if copieur else copier_fichier)
+    except BaseException:
+        with _verrou_manifeste:
+            _en_copie.pop((class_code, sha), None)
+        raise
+    with _verrou_manifeste:
+        manifeste().enregistrer(rel, sha, st.st_size)
+        _en_copie.pop((class_code, sha), None)
+    return p, target, sha
+
+def _copier_nouvelle_source(p: Path, st, target: Path, class_code: str, copieur: Copieur | None):
+    """
+    Source jamais vue (ou modifiée) : copiée à côté de sa cible en calculant l'empreinte au passage
+    (une seule lecture), puis gardée seulement si ce contenu n'est pas déjà publié pour la classe.
+    """
+    prepare = destination(target)
+    provisoire = prepare.with_name(f".{prepare.name}.{threading.get_ident()}.nouveau")
+    try:
+        sha = (copieur.copier_avec_empreinte if copieur else copier_avec_empreinte)(p, provisoire)
+        with _verrou_manifeste:
+            manifeste().noter_source(p, st, sha)
+            deja = manifeste().chercher(class_code, sha) or _en_copie.get((class_code, sha))
+            if deja is not None:
+                return p, ASSETS_DIR / deja, sha
+            os.replace(provisoire, prepare)
+            manifeste().enregistrer(f"{class_code}/{target.name}", sha, st.st_size)
+        return p, target, sha
+    finally:
+        if provisoire.exists():
+            provisoire.unlink()
+
+def pieces_publiees(seance, class_code: str) -> list:
+    """
+    [(nom, url)] des PJ d'une séance, publiées dans docs/assets/pj (copie/déduplication via le manifeste).
+    Les PJ introuvables sont ignorées : aucun chemin local (C:/Users/...) ne sort du poste.
+    """
+    pieces = []
+    for pj in seance.pieces:
+        cle = (class_code, pj)
+        if cle not in _publiees:
+            try:
+                copie = copy_attachment_to_repo(pj, class_code)
+            except Exception:
+                copie = None
+            _publiees[cle] = None if copie is None else (copie[1].name, web_url(copie[1]))
+        if _publiees[cle] is not None:
+            pieces.append(_publiees[cle])
+    return pieces
+
+def attachment_html(target: Path, apercu: Path | None) -> str:
+    url = web_url(target)
+    if apercu is None:
+        return f'<a href="{url}" target="_blank" rel="noopener">{LINK_TEXT}</a>'
+    # vignette légère, lien vers l'original
+    return (f'<a href="{url}" target="_blank" rel="noopener" title="{LINK_TEXT} {target.name}">'
+            f'<img class="apercu" src="{web_url(apercu)}" alt="{target.name}" loading="lazy"></a>')
+
+def _resultat_copie(future):
+    try:
+        return future.result()
+    except Exception:
+        return None
+
+def build_rows_html(seances, class_code: str) -> str:
+    # 1) toutes les copies de PJ lancées (pool de threads ; chacune hache sa source une fois),
+    # 2) aperçus en lot à partir des empreintes rendues par les copies (pool de processus),
+    # 3) rendu ligne par ligne
+    with Copieur() as copieur:
+        futures = {}    # une copie par source, même si plusieurs lignes la citent
+        for s in seances:
+            for pj in s.pieces:
+                if pj not in futures:
+                    futures[pj] = copieur.soumettre(copy_attachment_to_repo, pj, class_code, copieur)
+        copies = {pj: _resultat_copie(f) for pj, f in futures.items()}     # ≈ durée du fichier le plus lent
+        for pj, c in copies.items():    # réutilisées par les autres sorties (pieces_publiees)
+            _publiees[(class_code, pj)] = None if c is None else (c[1].name, web_url(c[1]))
+        empreintes = {c[0]: c[2] for c in copies.values() if c is not None}
+        apercus = apercus_pour(list(empreintes), APERCUS_DIR, empreintes)
+
+        rows = []
+        for s in seances:
+            faites = [copies[pj] for pj in s.pieces if copies[pj] is not None]
+            link_html = " ".join(attachment_html(t, apercus.get(src)) for src, t, _ in faites)
+            rows.append(f"<tr><td>{s.date_fr}</td><td>{s.chapitre}</td><td>{s.contenu}</td><td>{link_html}</td></tr>")
+    if copieur.nb:
+        log(f"[{class_code}] {copieur.rapport()}")
     return "\n".join(rows)
 
 # ========= EXPORT =========
 
-def export_one_class(code: str, spec: dict) -> Path:
-    level = spec["level_subdir"]
+def lire_progression(code: str, spec: dict) -> Progression:
     ods_path: Path = spec["ods"]
     sheet_name = spec.get("sheet_name")
     title = spec.get("title", f"Progression – {code}")
 
     log(f"Lecture ODS: {ods_path}")
-    df = read_ods_as_df(ods_path, sheet_name=sheet_name)
-    dbg(f"Colonnes initiales: {list(df.columns)} | lignes={len(df)}")
-
-    df = harmonize_headers(df, code)
-    dbg(f"Colonnes harmonisées: {list(df.columns)} | lignes={len(df)}")
+    df, cols = read_ods_as_df(ods_path, sheet_name=sheet_name)
+    dbg(f"Colonnes reconnues: {cols} | lignes={len(df)}")
+    absents = manquants(cols, CHAMPS)
+    if absents:
+        dbg(f"ATTENTION({code}) colonnes manquantes: {absents} | présentes: {list(df.columns)}")
+
+    # Dates converties une seule fois (illisibles / absentes -> None)
+    # Toutes les lignes sont lues : le filtre de date est appliqué au rendu (cf. fenetre_dates)
+    # Tri: dates d'abord (croissant), puis lignes sans date en bas
+    seances = seances_depuis_df(df, cols, classe=code)
+    return Progression(code, seances, titre=title, etab=spec["level_subdir"], source=ods_path).triee()
 
-    if "Date" in df.columns:
-        df["Date"] = df["Date"].apply(coerce_date)
-    else:
-        # si pas de colonne Date (très rare), crée-la vide pour rester robuste
-        df["Date"] = pd.NaT
+def page_progression(prog: Progression) -> Path:
+    return PAGES_DIR / prog.etab / HTML_NAME.format(classe=prog.code)
 
-    #  Aucun filtre: on garde toutes les lignes de l'ODS
-    # Tri: dates d'abord (croissant), puis lignes sans date en bas
-    df = df.sort_values("Date", na_position="last").reset_index(drop=True)
+def etablissement(prog: Progression) -> str:
+    """Nom de l'établissement (CLASSES[...]["etablissement"]), à défaut le sous-dossier de niveau."""
+    return CLASSES.get(prog.code, {}).get("etablissement") or prog.etab
 
-    rows_html = build_rows_html(df, class_code=code)
+def ecrire_progression(prog: Progression) -> Path:
+    rows_html = build_rows_html(prog.seances, class_code=prog.code)
+    manifeste().sauver()
     now_fr = datetime.now().strftime("%d/%m/%Y %H:%M")
 
-    out_dir = PAGES_DIR / level
-    ensure_dirs(out_dir, ASSETS_DIR)
+    out_file = page_progression(prog)
+    ensure_dirs(out_file.parent, ASSETS_DIR)
 
-    out_file = out_dir / HTML_NAME.format(classe=code)
+    if FILTRE_DATE:
+        lead = f"Séances affichées ≤ la date du jour ({datetime.now().strftime('%d/%m/%Y')})."
+    else:
+        lead = "Séances affichées automatiquement (toutes les lignes du tableur)."
     html = PAGE_TEMPLATE.format(
-        title=title,
+        title=prog.titre,
+        lead=lead,
         now_fr=now_fr,
         rows_html=rows_html,
         table_style=TABLE_STYLE,
     )
-    out_file.write_text(html, encoding="utf-8")
+    ecrire_texte(out_file, html)
     log(f"HTML écrit: {out_file}")
     return out_file
 
+def export_one_class(code: str, spec: dict) -> Path:
+    prog = lire_progression(code, spec)
+    if FILTRE_DATE:
+        prog, _ = appliquer_fenetre(prog)
+    return ecrire_progression(prog)
+
 def main():
     dbg(VERSION)
     ensure_dirs(PAGES_DIR, ASSETS_DIR)
     produced = []
-    for code, spec in CLASSES.items():
-        try:
-            produced.append(export_one_class(code, spec))
-        except Exception as e:
-            log(f"ERREUR sur {code}: {e}")
+    with Publication(REPO):
+        for code, spec in CLASSES.items():
+            try:
+                produced.append(export_one_class(code, spec))
+            except Exception as e:
+                log(f"ERREUR sur {code}: {e}")
     if produced:
         log("Export terminé."); return 0
     else:
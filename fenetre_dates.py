@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Publication datée : une séance n'est visible qu'à partir de sa date (séance ≤ aujourd'hui).
+Plutôt que de tout reconstruire chaque nuit, on calcule pour chaque classe la prochaine
+date à laquelle l'ensemble des séances visibles change (= la plus proche séance future).
+- appliquer_fenetre() : progression visible au jour J + prochaine échéance
+- echeances.json (.etat/) : classe -> prochaine échéance, mis à jour à chaque construction
+- Echeancier : utilisé par la surveillance pour ne se réveiller qu'à ces instants
+  et ne reconstruire que les classes concernées (aucun travail les jours sans séance).
+"""
+
+import json
+from datetime import date, datetime, time
+from pathlib import Path
+
+from modele import Progression
+
+# ========= CONFIG =========
+SANS_DATE_VISIBLES = False   # séances sans date : masquées (on ne sait pas si elles sont passées)
+JOUR_FIXE = None             # date de référence imposée (instantanés de verifier_instantanes.py) ; None : aujourd'hui
+
+
+def visible(seance, jour: date) -> bool:
+    if seance.date is None:
+        return SANS_DATE_VISIBLES
+    return seance.date <= jour
+
+
+def prochaine_echeance(prog: Progression, jour: date) -> date | None:
+    """Plus petite date de séance strictement postérieure à jour (None : plus rien à dévoiler)."""
+    futures = [s.date for s in prog.seances if s.date is not None and s.date > jour]
+    return min(futures) if futures else None
+
+
+def appliquer_fenetre(prog: Progression, jour: date | None = None):
+    """-> (Progression restreinte aux séances visibles au jour J, prochaine échéance)"""
+    jour = jour or JOUR_FIXE or date.today()
+    visibles = [s for s in prog.seances if visible(s, jour)]
+    restreinte = Progression(prog.code, visibles, titre=prog.titre, etab=prog.etab, source=prog.source)
+    return restreinte, prochaine_echeance(prog, jour)
+
+
+def instant(echeance: date) -> datetime:
+    """Une séance datée du jour D devient visible à D 00:00."""
+    return datetime.combine(echeance, time.min)
+
+
+class Echeancier:
+    """classe -> prochaine échéance, persisté en JSON (une construction partielle ne touche que ses classes)."""
+
+    def __init__(self, chemin: Path):
+        self.chemin = Path(chemin)
+        self.echeances = {}
+        self.charger()
+
+    def charger(self) -> "Echeancier":
+        echeances = {}
+        if self.chemin.exists():
+            try:
+                brut = json.loads(self.chemin.read_text(encoding="utf-8"))
+                echeances = {k: date.fromisoformat(v) for k, v in brut.items() if v}
+            except (ValueError, OSError):
+                echeances = {}
+        self.echeances = echeances      # remplacement en bloc (lu par un autre thread)
+        return self
+
+    def mettre_a_jour(self, code: str, echeance: date | None) -> None:
+        echeances = dict(self.echeances)
+        if echeance is None:
+            echeances.pop(code, None)
+        else:
+            echeances[code] = echeance
+        self.echeances = echeances
+
+    def en_json(self) -> str:
+        return json.dumps({k: v.isoformat() for k, v in sorted(self.echeances.items())}, indent=2)
+
+    def prochain_reveil(self) -> datetime | None:
+        """Instant du prochain changement de visibilité, toutes classes confondues."""
+        echeances = self.echeances
+        return instant(min(echeances.values())) if echeances else None
+
+    def classes_echues(self, maintenant: datetime | None = None) -> list:
+        """Classes dont l'ensemble visible a changé depuis la dernière construction."""
+        maintenant = maintenant or datetime.now()
+        return sorted(k for k, d in self.echeances.items() if instant(d) <= maintenant)
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+r"""
+Journal de la surveillance (remplace autom_update.log).
+- Hors du dépôt publié : %LOCALAPPDATA%\cours-de-maths\journal\<nom>.jsonl
+  (~/.local/state/cours-de-maths/journal ailleurs)
+- Une ligne JSON par événement : ts, niveau, msg + champs (classe, classes, evenement, durées...)
+- Fichier ouvert une seule fois, écritures regroupées en mémoire (vidées par lot, sur erreur, à l'arrêt)
+- Rotation par taille OU par âge, segments précédents compressés en .gz
+
+Consultation :
+  python journal.py                                  # 20 derniers événements
+  python journal.py -n 5 --classe 302 --evenement publication
+  python journal.py --niveau ERROR
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# ========= CONFIG =========
+JOURNAL_DIR = Path(os.environ.get("LOCALAPPDATA", Path.home() / ".local" / "state")) / "cours-de-maths" / "journal"
+TAILLE_MAX = 2 * 1024 * 1024     # octets avant rotation
+AGE_MAX = 7 * 24 * 3600          # secondes avant rotation (même si le fichier est petit)
+NB_SEGMENTS = 20                 # segments .gz conservés
+TAMPON = 64                      # enregistrements gardés en mémoire avant écriture
+
+
+class FormatJSON(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        ligne = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="seconds"),
+            "niveau": record.levelname,
+            "msg": record.getMessage(),
+        }
+        ligne.update(getattr(record, "champs", None) or {})
+        if record.exc_info:
+            ligne["trace"] = self.formatException(record.exc_info)
+        return json.dumps(ligne, ensure_ascii=False, default=str)
+
+
+class RotationTailleAge(logging.handlers.RotatingFileHandler):
+    """Rotation à TAILLE_MAX octets ou après AGE_MAX secondes ; segments compressés (.gz)."""
+
+    def __init__(self, chemin: Path, taille_max: int = TAILLE_MAX, age_max: float = AGE_MAX,
+                 nb_segments: int = NB_SEGMENTS):
+        super().__init__(chemin, maxBytes=taille_max, backupCount=nb_segments, encoding="utf-8")
+        self.age_max = age_max
+        self.namer = lambda nom: nom + ".gz"
+        self.rotator = self._compresser
+        self.debut = self._debut_segment()
+
+    def _debut_segment(self) -> float:
+        try:
+            with open(self.baseFilename, "r", encoding="utf-8") as f:
+                premiere = f.readline()
+            return datetime.fromisoformat(json.loads(premiere)["ts"]).timestamp()
+        except (OSError, ValueError, KeyError):
+            return time.time()
+
+    @staticmethod
+    def _compresser(source: str, dest: str) -> None:
+        with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+    def shouldRollover(self, record) -> bool:
+        if self.age_max and time.time() - self.debut > self.age_max and os.path.getsize(self.baseFilename) > 0:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self.debut = time.time()
+
+
+def configurer(nom: str = "surveillance", dossier: Path = JOURNAL_DIR) -> logging.Logger:
+    """Logger '<nom>' écrivant dans <dossier>/<nom>.jsonl (idempotent)."""
+    logger = logging.getLogger(f"cours-de-maths.{nom}")
+    if logger.handlers:
+        return logger
+    dossier.mkdir(parents=True, exist_ok=True)
+    fichier = RotationTailleAge(dossier / f"{nom}.jsonl")
+    fichier.setFormatter(FormatJSON())
+    tampon = logging.handlers.MemoryHandler(TAMPON, flushLevel=logging.ERROR, target=fichier)
+    logger.addHandler(tampon)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+def vider(logger: logging.Logger) -> None:
+    """Écrit sur disque les enregistrements en mémoire (fin de lot, inactivité...)."""
+    for h in logger.handlers:
+        h.flush()
+
+
+# ========= CONSULTATION =========
+
+def segments(nom: str, dossier: Path = JOURNAL_DIR) -> list:
+    """Fichiers du plus récent au plus ancien : <nom>.jsonl, <nom>.jsonl.1.gz, ..."""
+    base = dossier / f"{nom}.jsonl"
+    anciens = sorted(dossier.glob(f"{nom}.jsonl.*.gz"), key=lambda p: int(p.name.split(".")[-2]))
+    return ([base] if base.exists() else []) + anciens
+
+
+def _lignes(chemin: Path):
+    ouvrir = gzip.open if chemin.suffix == ".gz" else open
+    with ouvrir(chemin, "rt", encoding="utf-8") as f:
+        return f.readlines()
+
+
+def evenements(nom: str = "surveillance", dossier: Path = JOURNAL_DIR, classe=None, evenement=None, niveau=None):
+    """Événements du plus récent au plus ancien, filtrés (lecture paresseuse segment par segment)."""
+    for chemin in segments(nom, dossier):
+        for ligne in reversed(_lignes(chemin)):
+            try:
+                e = json.loads(ligne)
+            except ValueError:
+                continue
+            if classe and e.get("classe") != classe and classe not in (e.get("classes") or ()):
+                continue
+            if evenement and e.get("evenement") != evenement:
+                continue
+            if niveau and e.get("niveau") != niveau:
+                continue
+            yield e
+
+
+def _afficher(e: dict) -> str:
+    base = f"[{e['ts']}] {e['niveau']:<7} {e['msg']}"
+    extras = {k: v for k, v in e.items() if k not in ("ts", "niveau", "msg", "trace")}
+    if extras:
+        base += "  " + " ".join(f"{k}={v}" for k, v in extras.items())
+    return base
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Consulte le journal de la surveillance.")
+    ap.add_argument("-n", type=int, default=20, help="nombre d'événements (défaut : 20)")
+    ap.add_argument("--classe", help="ex. 302")
+    ap.add_argument("--evenement", help="ex. publication, export, git")
+    ap.add_argument("--niveau", help="INFO, WARNING, ERROR")
+    ap.add_argument("--nom", default="surveillance", help="journal à lire (défaut : surveillance)")
+    ap.add_argument("--dossier", type=Path, default=JOURNAL_DIR)
+    args = ap.parse_args(argv)
+
+    trouves = []
+    for e in evenements(args.nom, args.dossier, args.classe, args.evenement, args.niveau):
+        trouves.append(e)
+        if len(trouves) >= args.n:
+            break
+    for e in reversed(trouves):
+        print(_afficher(e))
+    if not trouves:
+        print("Aucun événement.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
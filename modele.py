@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Modèle commun des séances, partagé par tous les générateurs :
+- export_progression_public.py (tableau de progression HTML)
+- build_site.py (pages HTML par séance)
+- publish_selection.py / templates Markdown
+Une Progression est construite UNE fois par ODS (ou sélection JSON) puis passée
+telle quelle à chaque rendu : dates déjà converties, PJ déjà découpées,
+classe et chapitre internés (sys.intern) -> pas de re-parsing ni de copies par ligne.
+Pas de dépendance à pandas : les cellules vides (None, NaN, NaT, "") sont reconnues directement.
+"""
+
+import hashlib
+import re
+import sys
+from datetime import date, datetime, timedelta
+
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d")
+EXCEL_EPOCH = date(1899, 12, 30)  # nombres de jours Excel/LibreOffice
+SEP_EMPREINTE = "\x1f"             # séparateur de champs (absent des cellules)
+
+
+# ========= OUTILS =========
+
+def est_vide(v) -> bool:
+    """None, NaN, NaT ou texte blanc."""
+    if v is None:
+        return True
+    try:
+        if v != v:  # NaN / NaT
+            return True
+    except Exception:
+        pass
+    return str(v).strip() == ""
+
+def texte(v) -> str:
+    return "" if est_vide(v) else str(v).strip()
+
+def slugify(text: str, maxlen: int = 80) -> str:
+    t = text.lower()
+    t = re.sub(r"[^\w\s-]", "", t, flags=re.UNICODE)
+    t = re.sub(r"\s+", "-", t).strip("-")
+    return t[:maxlen] if len(t) > maxlen else t
+
+def parse_date(value) -> date:
+    """Date stricte (ValueError si illisible) : objets date/Timestamp ou texte ISO / jj/mm/aaaa."""
+    if est_vide(value):
+        raise ValueError(f"Date manquante: {value!r}")
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    v = str(value).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(v, fmt).date()
+        except ValueError:
+            pass
+    try:
+        return datetime.fromisoformat(v).date()
+    except ValueError:
+        raise ValueError(f"Date invalide: {value}")
+
+def coerce_date(v) -> date | None:
+    """Date tolérante (None si illisible) : accepte aussi 28.10.2025, 28-10-25 et les nombres Excel/Calc."""
+    if est_vide(v):
+        return None
+    try:
+        return parse_date(v)
+    except ValueError:
+        pass
+    brut = str(v).strip()
+    m = re.fullmatch(r"(\d{1,2})/(\d{1,2})/(\d{2}|\d{4})", brut.replace(".", "/").replace("-", "/"))
+    if m:
+        d, mth, yy = map(int, m.groups())
+        if yy < 100:
+            yy = 2000 + yy if yy < 70 else 1900 + yy
+        try:
+            return date(yy, mth, d)
+        except ValueError:
+            return None
+    try:
+        return EXCEL_EPOCH + timedelta(days=int(float(brut)))
+    except (ValueError, OverflowError):
+        return None
+
+def split_pieces(cell) -> tuple:
+    """'a.pdf; b\\c.png' -> ('a.pdf', 'b/c.png')"""
+    if est_vide(cell):
+        return ()
+    parts = (p.strip().replace("\\", "/") for p in str(cell).split(";"))
+    return tuple(p for p in parts if p)
+
+
+# ========= MODELE =========
+
+class Seance:
+    """Une ligne du cahier de textes, déjà normalisée."""
+    __slots__ = ("date", "classe", "chapitre", "titre", "contenu", "resume", "lien", "pieces")
+
+    def __init__(self, date=None, classe="", chapitre="", titre="", contenu="",
+                 resume="", lien="", pieces=()):
+        self.date = date                    # datetime.date ou None
+        self.classe = sys.intern(classe)
+        self.chapitre = sys.intern(chapitre)
+        self.titre = titre
+        self.contenu = contenu
+        self.resume = resume
+        self.lien = lien
+        self.pieces = pieces                # tuple de chemins (séparateur '/')
+
+    @property
+    def date_iso(self) -> str:
+        return self.date.isoformat() if self.date else ""
+
+    @property
+    def date_fr(self) -> str:
+        return self.date.strftime("%d/%m/%Y") if self.date else ""
+
+    @property
+    def intitule(self) -> str:
+        """Titre de la séance ; à défaut (ODS de progression sans colonne titre), son contenu."""
+        return self.titre or self.contenu
+
+    @property
+    def slug(self) -> str:
+        return slugify(f"{self.chapitre}-{self.intitule}")
+
+    @property
+    def nom_page(self) -> str:
+        """Nom de fichier (sans extension) : 2025-11-07-chapitre-titre"""
+        return f"{self.date_iso}-{self.slug}"
+
+    def empreinte(self) -> str:
+        """Empreinte du contenu normalisé : deux lignes identiques -> même empreinte, quel que soit l'ODS."""
+        champs = (self.date_iso, self.classe, self.chapitre, self.titre, self.contenu,
+                  self.resume, self.lien, SEP_EMPREINTE.join(self.pieces))
+        return hashlib.blake2b(SEP_EMPREINTE.join(champs).encode("utf-8"), digest_size=16).hexdigest()
+
+    def __repr__(self) -> str:
+        return f"Seance({self.date_iso or '?'}, {self.classe!r}, {self.chapitre!r}, {self.titre!r})"
+
+
+def _cle_tri(s: Seance):
+    # dates d'abord (croissant), séances sans date à la fin
+    return (s.date is None, s.date or date.min)
+
+
+class Progression:
+    """Toutes les séances issues d'une même source (ODS ou sélection)."""
+    __slots__ = ("code", "titre", "etab", "source", "seances")
+
+    def __init__(self, code: str, seances, titre: str = "", etab: str = "", source=None):
+        self.code = sys.intern(code)
+        self.titre = titre or f"Progression – {code}"
+        self.etab = sys.intern(etab)        # établissement / niveau (sous-dossier de publication)
+        self.source = source
+        self.seances = list(seances)
+
+    def triee(self) -> "Progression":
+        self.seances.sort(key=_cle_tri)
+        return self
+
+    def empreinte(self) -> str:
+        """Empreinte de la progression (ordre des séances compris) : inchangée -> rien à régénérer."""
+        h = hashlib.blake2b(f"{self.code}{SEP_EMPREINTE}{self.etab}".encode("utf-8"), digest_size=16)
+        for s in self.seances:
+            h.update(s.empreinte().encode("ascii"))
+        return h.hexdigest()
+
+    def par_classe(self) -> dict:
+        groupes = {}
+        for s in self.seances:
+            groupes.setdefault(s.classe, []).append(s)
+        return groupes
+
+    def __len__(self) -> int:
+        return len(self.seances)
+
+    def __iter__(self):
+        return iter(self.seances)
+
+
+def seances_depuis_df(df, cols: dict, classe: str = "", strict: bool = False) -> list:
+    """
+    Construit les Seance d'un DataFrame.
+    cols : champ -> nom de colonne (ou None), champs : date, classe, chapitre, titre, contenu, resume, lien, pj
+    classe : valeur par défaut si la feuille n'a pas de colonne classe (ODS par classe)
+    strict : True -> ValueError sur date illisible, sinon date=None
+    """
+    lire_date = parse_date if strict else coerce_date
+
+    def valeurs(champ):
+        c = cols.get(champ)
+        return df[c].tolist() if c is not None and c in df.columns else [None] * len(df)
+
+    colonnes = {k: valeurs(k) for k in ("date", "classe", "chapitre", "titre", "contenu", "resume", "lien", "pj")}
+    seances = []
+    for i in range(len(df)):
+        seances.append(Seance(
+            date=lire_date(colonnes["date"][i]),
+            classe=texte(colonnes["classe"][i]) or classe,
+            chapitre=texte(colonnes["chapitre"][i]),
+            titre=texte(colonnes["titre"][i]),
+            contenu=texte(colonnes["contenu"][i]),
+            resume=texte(colonnes["resume"][i]),
+            lien=texte(colonnes["lien"][i]),
+            pieces=split_pieces(colonnes["pj"][i]),
+        ))
+    return seances
+
+
+def seance_depuis_dict(r: dict) -> Seance:
+    """Ligne JSON déjà normalisée (clés : date, classe, chapitre, titre, resume, lien_externe, pieces_jointes)."""
+    return Seance(
+        date=parse_date(r["date"]),
+        classe=texte(r.get("classe")),
+        chapitre=texte(r.get("chapitre")),
+        titre=texte(r.get("titre")),
+        contenu=texte(r.get("contenu")),
+        resume=texte(r.get("resume")),
+        lien=texte(r.get("lien_externe")),
+        pieces=split_pieces(r.get("pieces_jointes")),
+    )
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+r"""
+Stock des pièces jointes publiées (docs/) : maîtrise de la taille du dépôt.
+1) Politique d'envoi (utilisée par export_progression_public.py) :
+   manifeste docs/assets/pj/_manifest.json  (chemin -> sha256, taille).
+   Une PJ dont le contenu est déjà publié pour la classe réutilise le fichier existant :
+   aucune nouvelle copie horodatée (2025-11-01_20-29-53_seance.odt...) d'un fichier inchangé.
+   Empreintes des sources mémorisées par (chemin, taille, mtime_ns) dans un cache local
+   (.etat/, jamais publié : il contient les chemins du poste) -> une source inchangée n'est pas relue.
+2) Élagage : fichiers de docs/ (PJ, aperçus) qui ne sont plus référencés par aucune page
+   rendue (href/src des .html) sont supprimés et retirés du manifeste ; octets gagnés affichés.
+   Suppressions sous le verrou de docs/ (ecriture_atomique.verrou_docs), comme une construction.
+
+Usage :
+  python stock_pj.py              # simulation : liste ce qui serait supprimé
+  python stock_pj.py --appliquer  # supprime réellement (puis git add -A docs && git commit)
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+from apercus import empreinte_fichier
+from copie_pj import taille_lisible
+from ecriture_atomique import ecrire_texte, existe, verrou_docs
+
+# ========= CONFIG =========
+REPO = Path(__file__).resolve().parent
+DOCS_DIR = REPO / "docs"
+SITE_PREFIXE = "/cours-de-maths/"
+
+# Dossiers de docs/ contenant des fichiers copiés (PJ et aperçus)
+MOTIFS_STOCK = (
+    "assets/pj/**/*",
+    "assets/apercus/*",
+    "assets/attachments/**/*",
+    "pieces_jointes/**/*",
+    "progressions/**/pieces_jointes/**/*",
+    "progressions/pieces_jointes/*",
+)
+NON_ELAGABLES = {"_manifest.json", "_echecs.json", ".nojekyll"}
+
+# guillemets doubles OU simples (les noms contiennent des apostrophes : "Capture d'écran...")
+RE_LIEN = re.compile(r'''(?:href|src)\s*=\s*(?:"([^"]*)"|'([^']*)')''', re.IGNORECASE)
+
+
+# ========= MANIFESTE =========
+
+class Manifeste:
+    """
+    Empreintes des PJ publiées : évite de re-hacher et de re-copier un contenu déjà présent.
+    sources : cache local source -> empreinte (None : pas de cache, ex. élagage).
+    """
+
+    def __init__(self, chemin: Path, sources: Path | None = None):
+        self.chemin = Path(chemin)
+        self.racine = self.chemin.parent
+        self.entrees = {}           # "classe/nom" -> {"sha256": ..., "taille": ...}
+        self.modifie = False
+        if self.chemin.exists():
+            try:
+                self.entrees = json.loads(self.chemin.read_text(encoding="utf-8"))
+            except ValueError:
+                self.entrees = {}
+        self._par_sha = {}          # sha256 -> {"classe/nom", ...}
+        for rel, e in self.entrees.items():
+            self._par_sha.setdefault(e["sha256"], set()).add(rel)
+        self._indexes = set()
+        self.chemin_sources = Path(sources) if sources else None
+        self.sources = {}           # chemin absolu de la source -> {"sha256", "taille", "mtime_ns"}
+        self.sources_modifiees = False
+        if self.chemin_sources and self.chemin_sources.exists():
+            try:
+                self.sources = json.loads(self.chemin_sources.read_text(encoding="utf-8"))
+            except ValueError:
+                self.sources = {}
+
+    def _indexer(self, dossier_rel: str) -> None:
+        """Fichiers déjà publiés absents du manifeste (premier passage) : hachés une fois."""
+        if dossier_rel in self._indexes:
+            return
+        self._indexes.add(dossier_rel)
+        dossier = self.racine / dossier_rel
+        if not dossier.is_dir():
+            return
+        for f in dossier.iterdir():
+            rel = f"{dossier_rel}/{f.name}"
+            if f.is_file() and rel not in self.entrees and f.name not in NON_ELAGABLES:
+                self.enregistrer(rel, empreinte_fichier(f), f.stat().st_size)
+
+    def chercher(self, dossier_rel: str, sha: str) -> str | None:
+        self._indexer(dossier_rel)
+        prefixe = f"{dossier_rel}/"
+        for rel in sorted(self._par_sha.get(sha, ())):
+            if rel.startswith(prefixe) and existe(self.racine / rel):
+                return rel
+        return None
+
+    def enregistrer(self, rel: str, sha: str, taille: int) -> None:
+        if self.entrees.get(rel, {}).get("sha256") != sha:
+            self.retirer(rel)
+            self.entrees[rel] = {"sha256": sha, "taille": taille}
+            self._par_sha.setdefault(sha, set()).add(rel)
+            self.modifie = True
+
+    def retirer(self, rel: str) -> None:
+        e = self.entrees.pop(rel, None)
+        if e is not None:
+            self._par_sha.get(e["sha256"], set()).discard(rel)
+            self.modifie = True
+
+    def empreinte_source(self, source: Path, st: os.stat_result) -> str | None:
+        """sha256 mémorisé de la source, si sa taille et sa date de modification n'ont pas changé."""
+        e = self.sources.get(str(Path(source).absolute()))
+        if e is not None and e["taille"] == st.st_size and e["mtime_ns"] == st.st_mtime_ns:
+            return e["sha256"]
+        return None
+
+    def noter_source(self, source: Path, st: os.stat_result, sha: str) -> None:
+        if self.chemin_sources is None:
+            return
+        self.sources[str(Path(source).absolute())] = {"sha256": sha, "taille": st.st_size, "mtime_ns": st.st_mtime_ns}
+        self.sources_modifiees = True
+
+    def sauver(self) -> None:
+        if self.modifie:
+            ecrire_texte(self.chemin, json.dumps(dict(sorted(self.entrees.items())), ensure_ascii=False, indent=1))
+            self.modifie = False
+        if self.sources_modifiees:
+            ecrire_texte(self.chemin_sources, json.dumps(dict(sorted(self.sources.items())),
+                                                         ensure_ascii=False, indent=1))
+            self.sources_modifiees = False
+
+
+# ========= ELAGAGE =========
+
+def liens_de_page(page: Path, docs_dir: Path) -> set:
+    """Chemins (résolus) des fichiers locaux référencés par une page HTML."""
+    cibles = set()
+    for double, simple in RE_LIEN.findall(page.read_text(encoding="utf-8", errors="replace")):
+        parts = urlsplit(double or simple)
+        if parts.scheme or parts.netloc:
+            continue
+        chemin = unquote(parts.path)
+        if not chemin:
+            continue
+        if chemin.startswith(SITE_PREFIXE):
+            cible = docs_dir / chemin[len(SITE_PREFIXE):]
+        elif chemin.startswith("/"):
+            cible = docs_dir / chemin.lstrip("/")
+        else:
+            cible = page.parent / chemin
+        cibles.add(cible.resolve())
+    return cibles
+
+
+def references(docs_dir: Path) -> set:
+    refs = set()
+    for page in docs_dir.rglob("*.html"):
+        refs |= liens_de_page(page, docs_dir)
+    return refs
+
+
+def stock(docs_dir: Path) -> set:
+    fichiers = set()
+    for motif in MOTIFS_STOCK:
+        fichiers |= {f.resolve() for f in docs_dir.glob(motif) if f.is_file() and f.name not in NON_ELAGABLES}
+    return fichiers
+
+
+def non_references(docs_dir: Path) -> tuple:
+    """-> (fichiers non référencés, octets correspondants)."""
+    orphelins = sorted(stock(docs_dir) - references(docs_dir))
+    return orphelins, sum(f.stat().st_size for f in orphelins)
+
+
+def elaguer(docs_dir: Path = DOCS_DIR, appliquer: bool = False) -> tuple:
+    """
+    -> (fichiers non référencés, octets correspondants). Supprime si appliquer=True, sous le
+    verrou de docs/ (cf. ecriture_atomique.verrou_docs) : aucune bascule de construction ni
+    aucun 'git add' entre le relevé des liens, les suppressions et l'écriture du manifeste.
+    """
+    if not appliquer:
+        return non_references(docs_dir)
+    with verrou_docs(docs_dir.parent):
+        orphelins, total = non_references(docs_dir)
+        manifeste = Manifeste(docs_dir / "assets" / "pj" / "_manifest.json")
+        for f in orphelins:
+            f.unlink()
+            try:
+                manifeste.retirer(f.relative_to(manifeste.racine.resolve()).as_posix())
+            except ValueError:
+                pass
+            # dossiers devenus vides
+            parent = f.parent
+            while parent != docs_dir.resolve() and not any(parent.iterdir()):
+                parent.rmdir()
+                parent = parent.parent
+        manifeste.sauver()
+    return orphelins, total
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Supprime de docs/ les pièces jointes et aperçus non référencés.")
+    ap.add_argument("--appliquer", action="store_true", help="supprimer réellement (sinon simulation)")
+    ap.add_argument("--docs", type=Path, default=DOCS_DIR, help="dossier publié (défaut : docs/)")
+    args = ap.parse_args(argv)
+
+    docs_dir = args.docs.resolve()
+    orphelins, total = elaguer(docs_dir, appliquer=args.appliquer)
+    for f in orphelins:
+        print(f"  {'supprimé' if args.appliquer else 'à supprimer'} : {f.relative_to(docs_dir).as_posix()}")
+    verbe = "gagnés" if args.appliquer else "récupérables"
+    print(f"{len(orphelins)} fichier(s) non référencé(s), {taille_lisible(total)} {verbe}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+r"""
+Vérification par instantanés : la construction produit-elle toujours les mêmes pages ?
+- Chaque classe de FIXTURES (ODS du dépôt) est reconstruite par construire.py dans un
+  dossier temporaire, toutes sorties comprises (progression, séances, Markdown, chapitres,
+  _classes.json, index, recherche, analyse), à une date de référence fixe (JOUR).
+- Les fichiers produits sont normalisés (horodatage « Dernière mise à jour », date du jour
+  de la ligne d'introduction, ?v= de l'index) puis comparés aux références de instantanes/<classe>/.
+- Fichiers non textuels (PJ copiées, vignettes) : listés dans instantanes/<classe>/_fichiers.txt,
+  avec le sha256 pour les PJ, le nom seul pour les vignettes (octets propres à la version de Pillow).
+- fixtures/pj_Progression.ods : PJ présentes dans le dépôt (fixtures/pj/, chemins relatifs à la
+  racine), dont une copie horodatée identique, une image illisible et une PJ absente -> copies,
+  réutilisation via le manifeste, vignettes (Pillow + PyMuPDF requis), liens des chapitres.
+  Copies faites une à une dans l'ordre du tableur : le choix entre deux contenus identiques est reproductible.
+- Une classe = un processus : les classes sont construites en parallèle.
+- Copies livrées avec le site autonome (cours-de-maths_site/..., cf. son README) : modele.py et
+  entetes.py doivent être identiques à ceux de la racine, sinon la vérification échoue.
+À lancer avant/après une optimisation du lecteur, du rendu ou du stock de PJ.
+
+Usage :
+  python verifier_instantanes.py              # compare, code de sortie 1 si différence
+  python verifier_instantanes.py 302 407      # seulement ces classes
+  python verifier_instantanes.py --maj        # (re)génère les références après un changement voulu
+"""
+
+import argparse
+import difflib
+import functools
+import hashlib
+import io
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from datetime import date
+from pathlib import Path
+
+# ========= CONFIG =========
+REPO = Path(__file__).resolve().parent
+INSTANTANES_DIR = REPO / "instantanes"
+JOUR = date(2025, 10, 25)        # date de référence du filtre de date (séances postérieures masquées)
+SORTIES = ("progression", "seances", "markdown", "chapitres", "classes", "index", "recherche", "analyse")
+DOSSIERS_PRODUITS = ("docs", "classes")
+EXT_TEXTE = {".html", ".md", ".json"}
+LISTE_FICHIERS = "_fichiers.txt"  # fichiers non textuels : chemin + sha256 (ou "-" : vignette)
+MAX_LIGNES_DIFF = 40
+SITE_AUTONOME = REPO / "cours-de-maths_site" / "cours-de-maths"
+MODULES_COPIES = ("modele.py", "entetes.py")    # copiés tels quels dans SITE_AUTONOME
+
+# classe -> (niveau / établissement, ODS de test)
+FIXTURES = {
+    "302":    ("College", REPO / "302_Progression.ods"),
+    "407":    ("College", REPO / "407_Progression.ods"),
+    "2nde_7": ("Seconde", REPO / "2nde_7_Progression.ods"),
+    "test":   ("Divers", REPO / "test.ods"),
+    "pj":     ("College", REPO / "fixtures" / "pj_Progression.ods"),
+}
+
+# parties variables d'une construction à l'autre
+NORMALISATIONS = (
+    (re.compile(r"(Dernière mise à jour automatique le )\d{2}/\d{2}/\d{4} \d{2}:\d{2}"), r"\1<horodatage>"),
+    (re.compile(r"(la date du jour \()\d{2}/\d{2}/\d{4}(\))"), r"\1<jour>\2"),
+    (re.compile(r"\?v=\d{14}"), "?v=<version>"),
+)
+
+
+def normaliser(texte: str) -> str:
+    for motif, remplacement in NORMALISATIONS:
+        texte = motif.sub(remplacement, texte)
+    return texte
+
+
+def construire_classe(code: str) -> dict:
+    """
+    Construit une classe dans un dossier temporaire -> {chemin relatif: contenu normalisé}.
+    Exécuté dans un processus neuf : la configuration des modules est modifiée AVANT leur import.
+    """
+    niveau, ods = FIXTURES[code]
+    racine = Path(tempfile.mkdtemp(prefix=f"instantane-{code}-"))
+    try:
+        os.chdir(REPO)      # PJ des fixtures : chemins relatifs à la racine du dépôt
+        import copie_pj
+        import export_progression_public as export
+        import fenetre_dates
+        export.REPO = racine
+        export.PAGES_DIR = racine / "docs" / "progressions"
+        export.ASSETS_DIR = racine / "docs" / "assets" / "pj"
+        export.APERCUS_DIR = racine / "docs" / "assets" / "apercus"
+        export.CLASSES = {code: {"level_subdir": niveau, "ods": ods, "sheet_name": None,
+                                 "title": f"Progression – {code}"}}
+        export.DEBUG = False
+        export.Copieur = functools.partial(copie_pj.Copieur, max_workers=1)
+        fenetre_dates.JOUR_FIXE = JOUR
+        import construire
+
+        with redirect_stdout(io.StringIO()) as sortie:
+            rc = construire.construire({code}, set(SORTIES))
+        if rc != 0:
+            raise RuntimeError(f"construction en échec :\n{sortie.getvalue()}")
+
+        produits, autres = {}, []
+        for dossier in DOSSIERS_PRODUITS:
+            for f in sorted((racine / dossier).rglob("*")):
+                if not f.is_file():
+                    continue
+                rel = f.relative_to(racine).as_posix()
+                if f.suffix in EXT_TEXTE:
+                    produits[rel] = normaliser(f.read_text(encoding="utf-8"))
+                elif f.suffix == ".webp":
+                    autres.append(f"{rel}  -")
+                else:
+                    autres.append(f"{rel}  {hashlib.sha256(f.read_bytes()).hexdigest()}")
+        if autres:
+            produits[LISTE_FICHIERS] = "\n".join(autres) + "\n"
+        return produits
+    finally:
+        shutil.rmtree(racine, ignore_errors=True)
+
+
+def copies_desynchronisees() -> list:
+    """Modules du site autonome absents ou différents de leur original à la racine."""
+    return [nom for nom in MODULES_COPIES
+            if not (SITE_AUTONOME / nom).exists()
+            or (SITE_AUTONOME / nom).read_bytes() != (REPO / nom).read_bytes()]
+
+
+def references(code: str) -> dict:
+    dossier = INSTANTANES_DIR / code
+    if not dossier.exists():
+        return {}
+    return {f.relative_to(dossier).as_posix(): f.read_text(encoding="utf-8")
+            for f in sorted(dossier.rglob("*")) if f.is_file()}
+
+
+def comparer(code: str, produits: dict) -> list:
+    """-> lignes du rapport (vide : identique aux références)."""
+    attendus = references(code)
+    if not attendus:
+        return [f"  aucune référence dans {INSTANTANES_DIR / code} (lancer --maj)"]
+    rapport = []
+    for rel in sorted(attendus.keys() - produits.keys()):
+        rapport.append(f"  manquant : {rel}")
+    for rel in sorted(produits.keys() - attendus.keys()):
+        rapport.append(f"  nouveau  : {rel}")
+    for rel in sorted(attendus.keys() & produits.keys()):
+        if attendus[rel] != produits[rel]:
+            diff = list(difflib.unified_diff(attendus[rel].splitlines(), produits[rel].splitlines(),
+                                             f"instantanes/{code}/{rel}", f"construit/{rel}", lineterm=""))
+            rapport.append(f"  différent : {rel}")
+            rapport += ["    " + l for l in diff[:MAX_LIGNES_DIFF]]
+            if len(diff) > MAX_LIGNES_DIFF:
+                rapport.append(f"    ... {len(diff) - MAX_LIGNES_DIFF} ligne(s) de plus")
+    return rapport
+
+
+def mettre_a_jour(code: str, produits: dict) -> None:
+    dossier = INSTANTANES_DIR / code
+    shutil.rmtree(dossier, ignore_errors=True)
+    for rel, texte in produits.items():
+        dest = dossier / rel
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        dest.write_text(texte, encoding="utf-8", newline="\n")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Compare la construction de chaque classe à ses instantanés de référence.")
+    ap.add_argument("classes", nargs="*", help=f"parmi : {', '.join(FIXTURES)} (défaut : toutes)")
+    ap.add_argument("--maj", action="store_true", help="réécrire les références au lieu de comparer")
+    ap.add_argument("-j", type=int, default=None, help="processus en parallèle (défaut : nombre de CPU)")
+    args = ap.parse_args(argv)
+    codes = args.classes or list(FIXTURES)
+    inconnues = [c for c in codes if c not in FIXTURES]
+    if inconnues:
+        ap.error(f"classe(s) sans fixture : {', '.join(inconnues)}")
+
+    t0 = time.perf_counter()
+    echecs = 0
+    for nom in copies_desynchronisees():
+        echecs += 1
+        print(f"[DIFF] {SITE_AUTONOME.relative_to(REPO).as_posix()}/{nom} : différent de {nom} (à recopier)")
+    # un processus neuf par classe (configuration des modules propre à chaque construction)
+    contexte = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=args.j, mp_context=contexte, max_tasks_per_child=1) as pool:
+        futures = {code: pool.submit(construire_classe, code) for code in codes}
+        for code, future in futures.items():
+            try:
+                produits = future.result()
+            except Exception as e:
+                echecs += 1
+                print(f"[ERREUR] {code} : {e}")
+                continue
+            if args.maj:
+                mettre_a_jour(code, produits)
+                print(f"[MAJ] {code} : {len(produits)} fichier(s) de référence")
+                continue
+            rapport = comparer(code, produits)
+            if rapport:
+                echecs += 1
+                print(f"[DIFF] {code}")
+                print("\n".join(rapport))
+            else:
+                print(f"[OK] {code} : {len(produits)} fichier(s) identiques")
+    print(f"{len(codes)} classe(s) en {time.perf_counter() - t0:.1f}s, {echecs} en échec.")
+    return 1 if echecs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())